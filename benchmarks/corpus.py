@@ -0,0 +1,145 @@
+import base64, random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+# a fixed clock so the same seed yields byte-identical corpora on every machine
+BASE_DATE = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+COMPANIES = ["Stripe", "Datadog", "Citadel", "Jane Street", "Palantir", "Snowflake", "Airbnb", "Ramp",
+             "Figma", "Databricks", "Robinhood", "Two Sigma", "Cloudflare", "Notion", "Scale AI", "Plaid"]
+ROLES = ["Software Engineering Intern", "Data Science Intern", "Machine Learning Intern", "Backend Intern",
+         "Security Intern", "Quantitative Research Intern", "Frontend Intern", "AI Research Intern"]
+SENDERS = {
+    "workday": "{c} <{slug}@myworkday.com>",
+    "greenhouse": "{c} Recruiting <no-reply@greenhouse.io>",
+    "lever": "{c} <no-reply@hire.lever.co>",
+    "direct": "{c} Campus Recruiting <campus@{slug}.com>",
+}
+SUBJECTS = {
+    "Applied": ["Thank you for applying to {c}", "Your application to {c}", "{c}: application received"],
+    "OA": ["Online Assessment - {c} {r}", "{c} coding challenge invitation"],
+    "Interview": ["Interview invitation: {c} {r}", "Next steps with {c}"],
+    "Rejected": ["Update on your {c} application", "Your application to {c}"],
+    "Offer": ["Offer letter - {c} {r}"],
+}
+OPENERS = {
+    "Applied": "Thank you for applying to the {r} position at {c}. We received your application on {d} and our team will review it shortly.",
+    "OA": "Congratulations! Please complete the HackerRank online assessment for the {r} role within 7 days.",
+    "Interview": "We'd like to schedule an interview for the {r} role. Please pick a time using the link below.",
+    "Rejected": "Unfortunately, we will not be moving forward with your application for the {r} position at {c}.",
+    "Offer": "We are thrilled to extend an offer for the {r} position at {c}!",
+}
+FOOTERS = {
+    "workday": "Powered by Workday\nThis email was sent by an automated system. Please do not reply to this email.\nPrivacy Policy | Unsubscribe",
+    "greenhouse": "Powered by Greenhouse\nManage your email preferences | Privacy Policy\n{c} is an equal opportunity employer.",
+    "lever": "Sent via Lever\nIf you have received this message in error, please notify the sender.\nUnsubscribe",
+    "direct": "CONFIDENTIALITY NOTICE: this message is intended only for the named recipient.\n(c) 2025 {c}. All rights reserved.",
+}
+FILLER = ("We appreciate your interest in joining our team and the time you invested in the process. "
+          "Our recruiting team reviews every application carefully against the needs of the role. ")
+# job alerts and talent-network mail from the same ATS senders: what metadata triage should skip
+NOISE_SUBJECTS = ["New jobs for you at {c}", "{c} is hiring: {r} and 12 more roles", "Join our talent community at {c}",
+                  "Webinar: a day in the life of a {c} intern", "Your weekly job alert: {r}"]
+NOISE_LISTING = "{r} - {c} - New York, NY / Remote - posted {n} days ago - View job\n"
+STATUSES = ["Applied"] * 6 + ["OA"] * 2 + ["Interview"] * 2 + ["Rejected"] * 3 + ["Offer"]
+# approximate body sizes in bytes and how often each occurs
+SIZES = [(600, 0.5), (4000, 0.3), (20000, 0.15), (120000, 0.05)]
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _pick_size(rng: random.Random) -> int:
+    x, acc = rng.random(), 0.0
+    for size, p in SIZES:
+        acc += p
+        if x <= acc:
+            return size
+    return SIZES[-1][0]
+
+def _html(text: str) -> str:
+    paras = "".join(f"<p style=\"margin:0 0 12px\">{line}</p>" for line in text.split("\n") if line)
+    return (f"<html><head><style>p{{font-family:Arial}}</style></head><body><table><tr><td>{paras}</td></tr></table>"
+            f"<img src=\"https://example.com/pixel.gif\"></body></html>")
+
+def make_message(i: int, rng: random.Random) -> Dict[str, Any]:
+    """One Gmail `format=full` message: a random ATS template, status, MIME layout and size class."""
+    company, role, status = rng.choice(COMPANIES), rng.choice(ROLES), rng.choice(STATUSES)
+    ats = rng.choice(list(SENDERS))
+    slug = company.lower().replace(" ", "")
+    sent = BASE_DATE - timedelta(days=rng.randint(0, 170), minutes=rng.randint(0, 1440))
+    fmt = dict(c=company, r=role, slug=slug, d=sent.strftime("%B %d, %Y"))
+
+    lines = ["Hi Alex,", "", OPENERS[status].format(**fmt)]
+    size = _pick_size(rng)
+    while sum(len(ln) for ln in lines) < size:
+        lines.append(FILLER * rng.randint(1, 4))
+    lines += ["", "Best,", f"{company} Recruiting"]
+    if rng.random() < 0.3:
+        lines += ["", f"On {(sent - timedelta(days=3)).strftime('%a, %b %d, %Y')} Alex <alex@example.com> wrote:",
+                  "> Hi, just checking on my application status.", "> Thanks!"]
+    lines += ["", FOOTERS[ats].format(**fmt)]
+    text = "\n".join(lines)
+
+    layout = rng.choice(["plain", "html", "alternative", "mixed"])
+    if layout == "plain":
+        payload = {"mimeType": "text/plain", "body": {"data": _b64(text)}}
+    elif layout == "html":
+        payload = {"mimeType": "text/html", "body": {"data": _b64(_html(text))}}
+    else:
+        alt = {"mimeType": "multipart/alternative", "parts": [
+            {"mimeType": "text/plain", "body": {"data": _b64(text)}},
+            {"mimeType": "text/html", "body": {"data": _b64(_html(text))}},
+        ]}
+        payload = alt if layout == "alternative" else {"mimeType": "multipart/mixed", "parts": [
+            alt, {"mimeType": "application/pdf", "filename": "offer.pdf", "body": {"attachmentId": f"att{i}", "size": 48213}},
+        ]}
+    payload["headers"] = [
+        {"name": "Subject", "value": rng.choice(SUBJECTS[status]).format(**fmt)},
+        {"name": "From", "value": SENDERS[ats].format(**fmt)},
+        {"name": "To", "value": "alex@example.com"},
+        {"name": "Date", "value": sent.strftime("%a, %d %b %Y %H:%M:%S +0000")},
+    ]
+    msg_id = f"{0x18c0000000000000 + i * 7919:016x}"
+    return {
+        "id": msg_id,
+        "threadId": msg_id if rng.random() < 0.7 else f"{0x18c0000000000000 + (i // 3) * 7919:016x}",
+        "labelIds": ["INBOX"],
+        "snippet": OPENERS[status].format(**fmt)[:100],
+        "internalDate": str(int(sent.timestamp() * 1000)),
+        "sizeEstimate": len(text),
+        "payload": payload,
+        "expected": {"status": status, "company": company, "role": role},
+    }
+
+def make_noise(i: int, rng: random.Random) -> Dict[str, Any]:
+    """A job-alert / marketing message from an ATS sender: HTML, a long listing, promotions tab, List-Id."""
+    company, role = rng.choice(COMPANIES), rng.choice(ROLES)
+    ats = rng.choice(["workday", "greenhouse", "lever"])
+    sent = BASE_DATE - timedelta(days=rng.randint(0, 170), minutes=rng.randint(0, 1440))
+    fmt = dict(c=company, r=role, slug=company.lower().replace(" ", ""))
+    listing = "".join(NOISE_LISTING.format(r=rng.choice(ROLES), c=rng.choice(COMPANIES), n=rng.randint(1, 30))
+                      for _ in range(rng.randint(20, 200)))
+    text = f"Hi Alex,\nHere are roles picked for you based on your profile.\n{listing}\n{FOOTERS[ats].format(**fmt)}"
+    msg_id = f"{0x18c0000000000000 + i * 7919:016x}"
+    return {
+        "id": msg_id, "threadId": msg_id, "labelIds": ["INBOX", "CATEGORY_PROMOTIONS"],
+        "snippet": text[:100].replace("\n", " "),
+        "internalDate": str(int(sent.timestamp() * 1000)),
+        "sizeEstimate": len(_html(text)),
+        "payload": {"mimeType": "text/html", "body": {"data": _b64(_html(text))}, "headers": [
+            {"name": "Subject", "value": rng.choice(NOISE_SUBJECTS).format(**fmt)},
+            {"name": "From", "value": SENDERS[ats].format(**fmt)},
+            {"name": "To", "value": "alex@example.com"},
+            {"name": "Date", "value": sent.strftime("%a, %d %b %Y %H:%M:%S +0000")},
+            {"name": "List-Id", "value": f"<jobs.{fmt['slug']}.example.com>"},
+        ]},
+        "expected": {"status": "Other", "company": company, "role": role},
+    }
+
+def make_corpus(n: int = 500, seed: int = 0, noise: float = 0.0) -> List[Dict[str, Any]]:
+    """`n` synthetic messages, newest first like Gmail's list order; deterministic for a given seed.
+    A `noise` fraction of them are job alerts rather than application mail."""
+    rng = random.Random(seed)
+    msgs = [make_noise(i, rng) if noise and rng.random() < noise else make_message(i, rng) for i in range(n)]
+    msgs.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+    return msgs
@@ -0,0 +1,225 @@
+import contextlib, json, re, threading, time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient.discovery import build
+
+from src.internship_logger import sheets_writer
+from src.internship_logger.google_session import GoogleSession, set_session
+from src.internship_logger.sheets_writer import HEADERS
+
+_BOUNDARY = "batch_fake"
+
+def _batch_parts(body: str):
+    # (content id, verb, path, json body or "") for each request inside a batch POST
+    return re.findall(
+        r"Content-ID: <[^+]+\+\s+([^>\s]+)>.*?\r?\n(GET|POST|PUT) (\S+) HTTP/1.1.*?\r?\n\r?\n(\{.*?\})?(?=\r?\n--|$)",
+        body, flags=re.S,
+    )
+
+def _batch_response(parts) -> tuple:
+    out = [
+        f"--{_BOUNDARY}\r\nContent-Type: application/http\r\nContent-ID: <response-x + {cid}>\r\n\r\n"
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+        for cid, status, payload in parts
+    ]
+    content = "".join(out) + f"--{_BOUNDARY}--"
+    return httplib2.Response({"status": "200", "content-type": f"multipart/mixed; boundary={_BOUNDARY}"}), content.encode("utf-8")
+
+def _json_response(payload, status: int = 200) -> tuple:
+    return httplib2.Response({"status": str(status), "content-type": "application/json"}), json.dumps(payload).encode("utf-8")
+
+class FakeGmailHttp:
+    """Serves messages.list, getProfile, history.list and batched messages.get from a corpus.
+
+    The query is not evaluated: every corpus message matches. `latency` seconds are slept
+    per HTTP round trip to stand in for the network. Ids in `fail_once` get a 429 on their
+    first messages.get; `batches` records the ids of every batch request in order.
+    """
+
+    def __init__(self, corpus: List[Dict[str, Any]], latency: float = 0.0, history_id: int = 1000,
+                 fail_once: Iterable[str] = ()):
+        self.messages = {m["id"]: {k: v for k, v in m.items() if k != "expected"} for m in corpus}
+        self.order = [m["id"] for m in corpus]
+        self.latency = latency
+        self.history_id = history_id
+        self.fail_once = set(fail_once)
+        self.batches: List[List[str]] = []
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, kind: str, n: int = 1) -> None:
+        with self._lock:
+            self.calls[kind] += n
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(uri)
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.startswith("/batch"):
+            self._count("batch")
+            body = body.decode("utf-8") if isinstance(body, bytes) else body
+            parts, ids = [], []
+            for cid, _, path, _ in _batch_parts(body):
+                p = urlparse(path)
+                msg_id = p.path.rsplit("/", 1)[-1]
+                msg = self.messages.get(msg_id)
+                fmt = parse_qs(p.query).get("format", ["full"])[0]
+                self._count("messages.get" if fmt == "full" else f"messages.get:{fmt}")
+                ids.append(msg_id)
+                with self._lock:
+                    throttled = msg_id in self.fail_once
+                    self.fail_once.discard(msg_id)
+                if throttled:
+                    parts.append((cid, "429 Too Many Requests", {"error": {"code": 429}}))
+                elif msg is None:
+                    parts.append((cid, "404 Not Found", {"error": {"code": 404}}))
+                elif fmt == "full":
+                    parts.append((cid, "200 OK", msg))
+                else:
+                    payload = {k: v for k, v in msg["payload"].items() if k in ("mimeType", "headers")}
+                    parts.append((cid, "200 OK", dict({k: v for k, v in msg.items() if k != "payload"}, payload=payload)))
+            with self._lock:
+                self.batches.append(ids)
+            resp = _batch_response(parts)
+            self._count("batch_bytes", len(resp[1]))
+            return resp
+        if url.path.endswith("/messages"):
+            self._count("messages.list")
+            start = int(qs.get("pageToken", 0))
+            size = int(qs.get("maxResults", 100))
+            page = [{"id": i, "threadId": self.messages[i]["threadId"]} for i in self.order[start:start + size]]
+            resp = {"messages": page, "resultSizeEstimate": len(self.order)}
+            if start + size < len(self.order):
+                resp["nextPageToken"] = str(start + size)
+            return _json_response(resp)
+        if url.path.endswith("/profile"):
+            self._count("getProfile")
+            return _json_response({"emailAddress": "alex@example.com", "historyId": str(self.history_id)})
+        if url.path.endswith("/history"):
+            self._count("history.list")
+            return _json_response({"history": [], "historyId": str(self.history_id)})
+        return _json_response({"error": {"code": 404}}, 404)
+
+class FakeCalendarHttp:
+    """Calendar batch inserts/updates against an in-memory event store (409 on duplicate inserts).
+    Event ids in `fail_ids` always get a 500."""
+
+    def __init__(self, latency: float = 0.0, fail: Optional[int] = None, fail_ids: Iterable[str] = ()):
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.latency = latency
+        self.fail = fail    # answer every call with this HTTP status (e.g. 403) to simulate an outage
+        self.fail_ids = set(fail_ids)
+        self.calls: Counter = Counter()
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls["batch"] += 1
+        body = body.decode("utf-8") if isinstance(body, bytes) else body
+        parts = []
+        for cid, verb, _, payload in _batch_parts(body):
+            event = json.loads(payload)
+            self.calls["events." + ("insert" if verb == "POST" else "update")] += 1
+            if self.fail:
+                parts.append((cid, f"{self.fail} Error", {"error": {"code": self.fail}}))
+            elif event["id"] in self.fail_ids:
+                parts.append((cid, "500 Internal Server Error", {"error": {"code": 500}}))
+            elif verb == "POST" and event["id"] in self.events:
+                parts.append((cid, "409 Conflict", {"error": {"code": 409}}))
+            else:
+                self.events[event["id"]] = event
+                parts.append((cid, "200 OK", event))
+        return _batch_response(parts)
+
+class FakeWorksheet:
+    """In-memory gspread Worksheet with the calls the logger uses; counts API calls (`calls`)
+    and keeps their order (`log`)."""
+
+    title = "Applications"
+
+    def __init__(self, rows=None, latency: float = 0.0):
+        self.rows = [list(HEADERS)] + [list(r) for r in (rows or [])]
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.log: List[str] = []
+
+    def _call(self, name: str) -> None:
+        self.calls[name] += 1
+        self.log.append(name)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def row_values(self, r):
+        self._call("row_values")
+        return list(self.rows[r - 1]) if r <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._call("col_values")
+        vals = [r[col - 1] if len(r) >= col else "" for r in self.rows]
+        while vals and not vals[-1]:
+            vals.pop()
+        return vals
+
+    def findall(self, value):
+        self._call("findall")
+        return [type("Cell", (), {"row": i + 1})() for i, r in enumerate(self.rows) if value in r]
+
+    def update(self, rng, values):
+        self._call("update")
+        self.rows[int(re.match(r"[A-Z]+(\d+)", rng).group(1)) - 1] = list(values[0])
+
+    def batch_update(self, data):
+        self._call("batch_update")
+        for d in data:
+            self.rows[int(re.match(r"[A-Z]+(\d+)", d["range"]).group(1)) - 1] = list(d["values"][0])
+
+    def append_row(self, values):
+        self._call("append_row")
+        self.rows.append(list(values))
+
+    def append_rows(self, values):
+        self._call("append_rows")
+        start = len(self.rows) + 1
+        self.rows.extend(list(v) for v in values)
+        return {"updates": {"updatedRange": f"{self.title}!A{start}:{sheets_writer.LAST_COL}{len(self.rows)}"}}
+
+class _FakeSpreadsheet:
+    def __init__(self, ws):
+        self.ws = ws
+
+    def worksheet(self, title):
+        return self.ws
+
+class FakeSession(GoogleSession):
+    """A GoogleSession whose clients are the in-memory fakes above; nothing touches token.json."""
+
+    def __init__(self, gmail_http: FakeGmailHttp, cal_http: FakeCalendarHttp, ws: FakeWorksheet):
+        super().__init__(token_file="")
+        self.gmail_http = gmail_http
+        self._services = {
+            ("gmail", "v1"): build("gmail", "v1", http=gmail_http, static_discovery=True),
+            ("calendar", "v3"): build("calendar", "v3", http=cal_http, static_discovery=True),
+        }
+        self._gspread = type("FakeGspread", (), {"open": lambda _, name: _FakeSpreadsheet(ws)})()
+
+    def _authorized_http(self):
+        return self.gmail_http
+
+@contextlib.contextmanager
+def google_fakes(corpus: List[Dict[str, Any]], latency: float = 0.0, ws=None):
+    """Installs a FakeSession serving `corpus` for the duration.
+
+    Yields (gmail_http, calendar_http, worksheet) so callers can inspect call counts.
+    """
+    gmail_http = FakeGmailHttp(corpus, latency=latency)
+    cal_http = FakeCalendarHttp(latency=latency)
+    ws = ws if ws is not None else FakeWorksheet(latency=latency)
+    previous = set_session(FakeSession(gmail_http, cal_http, ws))
+    try:
+        yield gmail_http, cal_http, ws
+    finally:
+        set_session(previous)
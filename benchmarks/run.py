@@ -0,0 +1,193 @@
+import argparse, contextlib, dataclasses, io, json, os, platform, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from src.internship_logger import main as app_main
+from src.internship_logger import engines, metrics
+from src.internship_logger.email_client import extract_plain_text
+from src.internship_logger.settings import load_settings
+from src.internship_logger.sheets_writer import HEADERS, SheetBatchWriter, upsert_row
+from src.internship_logger.state_store import SqliteStateStore
+
+from .corpus import make_corpus
+from .fakes import FakeWorksheet, google_fakes
+
+def _timed(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    runs.sort()
+    return {"best_s": round(runs[0], 4), "median_s": round(runs[len(runs) // 2], 4)}
+
+def _per_item(stats: Dict[str, float], n: int) -> Dict[str, float]:
+    return dict(stats, ms_per_item=round(stats["median_s"] * 1000 / max(1, n), 4), n=n)
+
+def bench_extract(corpus: List[Dict[str, Any]], repeat: int, max_tokens: Optional[int]) -> Dict[str, Any]:
+    stats = _timed(lambda: [extract_plain_text(m, max_tokens=max_tokens) for m in corpus], repeat)
+    mb = sum(m["sizeEstimate"] for m in corpus) / 1e6
+    return dict(_per_item(stats, len(corpus)), mb_per_s=round(mb / max(stats["median_s"], 1e-9), 2))
+
+def _items(corpus: List[Dict[str, Any]], max_tokens: Optional[int]):
+    items = []
+    for m in corpus:
+        subject, from_email, body = extract_plain_text(m, max_tokens=max_tokens)
+        items.append((subject, from_email, body, datetime.fromtimestamp(int(m["internalDate"]) / 1000, tz=timezone.utc)))
+    return items
+
+def bench_engine(name: str, cfg, corpus: List[Dict[str, Any]], repeat: int, max_tokens: Optional[int]) -> Dict[str, Any]:
+    engine = engines.get_engine(name, cfg)
+    try:
+        t0 = time.perf_counter()
+        engine.load()
+        load_s = time.perf_counter() - t0
+    except (ImportError, OSError) as e:
+        # the engine's libraries or models aren't installed here
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    items = _items(corpus, max_tokens)
+    out: List[Dict[str, Any]] = []
+    stats = _timed(lambda: out.__setitem__(slice(None), engine.parse(items)), repeat)
+    accuracy = {
+        field: round(sum(o[field] == m["expected"][field] for o, m in zip(out, corpus)) / max(1, len(corpus)), 3)
+        for field in ("status", "company", "role")
+    }
+    engine.unload()
+    return dict(_per_item(stats, len(items)), load_s=round(load_s, 3), accuracy=accuracy)
+
+def _rows(corpus: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"Company": m["expected"]["company"], "Role": m["expected"]["role"], "Status": m["expected"]["status"],
+             "EmailId": m["id"], "ThreadId": m["threadId"]} for m in corpus]
+
+def bench_sheets(corpus: List[Dict[str, Any]], repeat: int, existing: int) -> Dict[str, Any]:
+    """upsert_row (one lookup + one write per row) vs SheetBatchWriter, half updates / half appends."""
+    rows = _rows(corpus)
+    seed_rows = [[r.get(h, "") for h in HEADERS] for r in rows[: len(rows) // 2]]
+    seed_rows += [[""] * 6 + [f"old{i}"] for i in range(existing)]
+    report: Dict[str, Any] = {}
+    for name in ("upsert_row", "batch_writer"):
+        calls = {}
+        def run():
+            ws = FakeWorksheet(seed_rows)
+            if name == "upsert_row":
+                for r in rows:
+                    upsert_row(ws, r)
+            else:
+                with SheetBatchWriter(ws) as writer:
+                    for r in rows:
+                        writer.add(r)
+            calls.update(ws.calls)
+        report[name] = dict(_per_item(_timed(run, repeat), len(rows)), api_calls=sum(calls.values()))
+    return report
+
+def bench_process_once(cfg, corpus: List[Dict[str, Any]], engine: str, latency: float, serial: bool) -> Dict[str, Any]:
+    """One cold run of process_once against the fakes, with throwaway state and caches."""
+    with tempfile.TemporaryDirectory() as tmp:
+        run_cfg = dataclasses.replace(
+            cfg,
+            app=dict(cfg.app, dry_run=False, metrics={"summary": False}),
+            gmail=dict(cfg.gmail, sync="full"),
+            nlp=dict(cfg.nlp or {}, engine=engine, result_cache=dict((cfg.nlp or {}).get("result_cache") or {}, enabled=False)),
+            calendar=dict(cfg.calendar, enabled=True),
+        )
+        store_path = os.path.join(tmp, "state.sqlite")
+        saved = (app_main.load_settings, app_main.open_state_store)
+        app_main.load_settings = lambda: run_cfg
+        app_main.open_state_store = lambda app_cfg: SqliteStateStore(store_path, legacy_json=None)
+        try:
+            with google_fakes(corpus, latency=latency) as (gmail_http, cal_http, ws):
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    app_main.process_once(serial=serial, engine_name=engine)
+                wall = time.perf_counter() - t0
+        finally:
+            app_main.load_settings, app_main.open_state_store = saved
+        engines.unload_engines()
+    return {
+        "wall_s": round(wall, 4), "ms_per_item": round(wall * 1000 / max(1, len(corpus)), 4), "n": len(corpus),
+        "rows_written": len(ws.rows) - 1, "events": len(cal_http.events),
+        "api_calls": {"gmail": dict(gmail_http.calls), "calendar": dict(cal_http.calls), "sheets": dict(ws.calls)},
+        "timers": {f"{t['name']}{metrics._fmt_labels(t['labels'])}": t["total_s"] for t in metrics.METRICS.snapshot()["timers"]},
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(n: int = 300, seed: int = 0, repeat: int = 3, engine_names: Optional[List[str]] = None,
+        latency: float = 0.0, process_engine: str = "rules", cfg=None, noise: float = 0.0) -> Dict[str, Any]:
+    cfg = cfg or load_settings()
+    corpus = make_corpus(n, seed, noise)
+    max_tokens = (cfg.gmail or {}).get("body_token_budget")
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "n": n, "seed": seed, "noise": noise, "repeat": repeat, "latency_s": latency,
+        },
+        "extract_plain_text": bench_extract(corpus, repeat, max_tokens),
+        "engines": {name: bench_engine(name, cfg, corpus, repeat, max_tokens) for name in (engine_names or ["rules"])},
+        "sheets": bench_sheets(corpus, repeat, existing=1000),
+        "process_once": {
+            mode: bench_process_once(cfg, corpus, process_engine, latency, serial=mode == "serial")
+            for mode in ("serial", "pipelined")
+        },
+    }
+    report["meta"]["peak_rss_mb"] = round(metrics.peak_rss_mb(), 1)
+    return report
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[prefix + k] = v
+    return out
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[str]:
+    """Timing metrics that got more than `threshold` slower than the baseline report."""
+    base, cur = _flatten(baseline), _flatten(current)
+    slower = []
+    for key, value in cur.items():
+        if key.startswith("meta.") or not key.endswith(("_s", "ms_per_item")) or not base.get(key):
+            continue
+        change = value / base[key] - 1
+        if change > threshold:
+            slower.append(f"{key}: {base[key]} -> {value} (+{change:.0%})")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a synthetic mailbox and fake Google APIs")
+    parser.add_argument("--n", type=int, default=300, help="Synthetic messages to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", default="rules", help="Comma-separated engines to benchmark (e.g. rules,spacy,transformer)")
+    parser.add_argument("--process-engine", default="rules", help="Engine used for the end-to-end process_once run")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of simulated network latency per API round trip")
+    parser.add_argument("--noise", type=float, default=0.0, help="Fraction of the mailbox that is job alerts / marketing")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline report to compare against; exits 1 on a >threshold slowdown")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    report = run(args.n, args.seed, args.repeat, args.engines.split(","), args.latency, args.process_engine, noise=args.noise)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[Bench] wrote {args.out}")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            slower = compare(json.load(f), report, args.threshold)
+        for line in slower:
+            print(f"[Bench] slower {line}")
+        if slower:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
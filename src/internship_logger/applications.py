@@ -0,0 +1,153 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# statuses only move forward; Offer and Rejected are both final
+STATUS_RANK = {"Applied": 0, "OA": 1, "Interview": 2, "Offer": 3, "Rejected": 3}
+FINAL_RANK = 3
+
+_COMPANY_NOISE = {"inc", "llc", "ltd", "corp", "corporation", "co", "company", "plc", "gmbh", "limited", "the",
+                  "careers", "recruiting", "talent", "acquisition", "team", "hiring", "jobs", "via", "workday"}
+_ROLE_NOISE = {"intern", "internship", "interns", "summer", "fall", "spring", "winter", "the", "a", "an", "role",
+               "position", "program", "co", "op"}
+_ROLE_SYNONYMS = {"engineer": "engineering", "eng": "engineering", "swe": "software engineering",
+                  "ml": "machine learning", "ai": "artificial intelligence", "dev": "developer"}
+_UNKNOWN_COMPANIES = {"", "unknown"}
+# company names this close (difflib ratio) inside one block are the same employer
+COMPANY_MATCH = 0.85
+
+def normalize_company(name: str) -> str:
+    return " ".join(t for t in re.findall(r"[a-z0-9]+", (name or "").lower()) if t not in _COMPANY_NOISE)
+
+def normalize_role(role: str) -> str:
+    """"Software Engineer Intern - Summer 2025" and "SWE Internship" both become "software engineering";
+    generic roles ("Intern", "Unknown") become ""."""
+    words = []
+    for t in re.findall(r"[a-z0-9]+", (role or "").lower()):
+        if t in _ROLE_NOISE or t == "unknown" or re.fullmatch(r"(?:19|20)\d\d", t):
+            continue
+        words.extend(_ROLE_SYNONYMS.get(t, t).split())
+    return " ".join(words)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class ApplicationIndex:
+    """One record per application, so later emails (OA invite, interview, rejection) update the
+    application's sheet row instead of adding one per email.
+
+    An email joins an application by thread id, then by exact (company, role) key, then by a
+    fuzzy company match restricted to applications sharing a company token (blocking), so a
+    lookup only ever compares against a handful of candidates. Records are plain dicts so the
+    state store can persist them as JSON; `id` is the EmailId of the application's first email
+    and stays the sheet row key.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._by_thread: Dict[str, str] = {}
+        self._by_key: Dict[Tuple[str, str], str] = {}
+        self._blocks: Dict[str, Set[str]] = {}
+        self._dirty: Set[str] = set()
+        for rec in records:
+            self._add(rec)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _add(self, rec: Dict[str, Any]) -> None:
+        self.records[rec["id"]] = rec
+        for t in rec.get("threads", []):
+            self._by_thread.setdefault(t, rec["id"])
+        self._by_key.setdefault((rec["company_key"], rec["role_key"]), rec["id"])
+        for tok in rec["company_key"].split():
+            self._blocks.setdefault(tok, set()).add(rec["id"])
+
+    def match(self, company: str, role: str, thread_id: str = "") -> Optional[Dict[str, Any]]:
+        if thread_id and thread_id in self._by_thread:
+            return self.records[self._by_thread[thread_id]]
+        ckey, rkey = normalize_company(company), normalize_role(role)
+        if ckey in _UNKNOWN_COMPANIES:
+            return None
+        if (ckey, rkey) in self._by_key:
+            return self.records[self._by_key[(ckey, rkey)]]
+        candidates = set().union(*(self._blocks.get(tok, ()) for tok in ckey.split()))
+        best, best_score = None, None
+        for rid in candidates:
+            rec = self.records[rid]
+            sim = 1.0 if rec["company_key"] == ckey else SequenceMatcher(None, rec["company_key"], ckey).ratio()
+            if sim < COMPANY_MATCH:
+                continue
+            # a role-less email (rejections rarely name the role) joins the company's latest application
+            same_role = rec["role_key"] == rkey
+            if not (same_role or not rkey or not rec["role_key"]):
+                continue
+            score = (sim, same_role, rec.get("updated", ""))
+            if best_score is None or score > best_score:
+                best, best_score = rec, score
+        return best
+
+    def update(self, email_id: str, thread_id: str, parsed: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Folds one parsed email into its application. Returns (record, change) where change is
+        new, advanced (status moved forward) or unchanged. Re-applying an email is a no-op."""
+        rec = self.match(parsed["company"], parsed["role"], thread_id)
+        status = parsed["status"]
+        if rec is None:
+            rec = {
+                "id": email_id, "company": parsed["company"], "role": parsed["role"],
+                "company_key": normalize_company(parsed["company"]), "role_key": normalize_role(parsed["role"]),
+                "status": status, "date_applied": parsed["date_applied"].date().isoformat(),
+                "threads": [thread_id] if thread_id else [], "emails": [email_id], "followup": False, "updated": _now(),
+            }
+            self._add(rec)
+            self._dirty.add(rec["id"])
+            return rec, "new"
+        change = "unchanged"
+        if email_id not in rec["emails"]:
+            rec["emails"].append(email_id)
+            cur, new = STATUS_RANK.get(rec["status"], -1), STATUS_RANK.get(status, -1)
+            if new > cur and cur < FINAL_RANK:
+                rec["status"] = status
+                change = "advanced"
+        if thread_id and thread_id not in rec["threads"]:
+            rec["threads"].append(thread_id)
+            self._by_thread.setdefault(thread_id, rec["id"])
+        if not rec["role_key"] and normalize_role(parsed["role"]):
+            rec["role"], rec["role_key"] = parsed["role"], normalize_role(parsed["role"])
+            self._by_key.setdefault((rec["company_key"], rec["role_key"]), rec["id"])
+        rec["updated"] = _now()
+        self._dirty.add(rec["id"])
+        return rec, change
+
+    def mark_followup(self, app_id: str) -> None:
+        self.records[app_id]["followup"] = True
+        self._dirty.add(app_id)
+
+    def save(self, store) -> None:
+        """Writes changed records through `store.save_applications`; committed with the store."""
+        if self._dirty:
+            store.save_applications([self.records[i] for i in sorted(self._dirty)])
+            self._dirty.clear()
+
+def load_index(store) -> ApplicationIndex:
+    return ApplicationIndex(store.applications())
+
+def application_row(rec: Dict[str, Any], followup_days: int, timestamp: str) -> Dict[str, Any]:
+    applied = date.fromisoformat(rec["date_applied"])
+    n = len(rec["emails"])
+    return {
+        "Timestamp": timestamp,
+        "Company": rec["company"],
+        "Role": rec["role"],
+        "Date Applied": rec["date_applied"],
+        "Status": rec["status"],
+        "Source": "Email",
+        "EmailId": rec["id"],
+        "ThreadId": rec["threads"][0] if rec["threads"] else "",
+        "FollowUp Due": (applied + timedelta(days=followup_days)).isoformat(),
+        "Notes": f"{n} emails" if n > 1 else "",
+    }
+
+def summarize(changes: List[str]) -> str:
+    return " ".join(f"{c}={changes.count(c)}" for c in ("new", "advanced", "unchanged") if c in changes)
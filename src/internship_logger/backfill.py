@@ -0,0 +1,230 @@
+import csv, hashlib, mmap, os, re
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytz
+
+from . import metrics
+from .email_client import _clean_text
+from .engines import get_engine
+from .gmail_query import compile_query
+from .result_cache import open_result_cache, parse_cached
+from .sheets_writer import HEADERS
+from .text_normalize import html_to_text, normalize_body
+
+# the "From " separator line of an mbox entry: `From <sender> <asctime date>`; body lines that
+# merely start with "From " (and weren't escaped to ">From ") don't carry the weekday/month pair
+_FROM_LINE = re.compile(rb"^From \S+\s+[A-Z][a-z]{2} [A-Z][a-z]{2} ", re.M)
+# pages of an mbox already parsed are handed back to the kernel in steps of this many bytes
+_RELEASE_EVERY = 8 << 20
+
+def iter_mbox(path: str) -> Iterator[bytes]:
+    """Raw messages of an mbox file, one at a time, from a read-only memory map."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        start, released = None, 0
+        for m in _FROM_LINE.finditer(mm):
+            if start is not None:
+                yield _unescape(mm[start:m.start()])
+            start = mm.find(b"\n", m.start()) + 1 or len(mm)
+            # RSS stays flat on multi-GB archives: give back the pages behind us
+            done = m.start() - m.start() % mmap.PAGESIZE
+            if done - released >= _RELEASE_EVERY and hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+                mm.madvise(mmap.MADV_DONTNEED, released, done - released)
+                released = done
+        if start is not None:
+            yield _unescape(mm[start:])
+
+def _unescape(raw: bytes) -> bytes:
+    # mboxrd quoting: ">From " -> "From ", ">>From " -> ">From "
+    return re.sub(rb"^>(>*From )", rb"\1", raw, flags=re.M)
+
+def iter_source(path: str) -> Iterator[bytes]:
+    """Raw messages from an mbox file or a directory tree of .eml / .mbox files."""
+    if not os.path.isdir(path):
+        yield from iter_mbox(path)
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            if name.lower().endswith(".eml"):
+                with open(full, "rb") as f:
+                    yield f.read()
+            elif name.lower().endswith(".mbox"):
+                yield from iter_mbox(full)
+
+_PARSER = BytesParser(policy=policy.default)
+
+def _content(part) -> str:
+    try:
+        return part.get_content()
+    except (LookupError, ValueError):
+        return (part.get_payload(decode=True) or b"").decode("utf-8", errors="replace")
+
+def parse_message(raw: bytes, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """The fields of one RFC 822 message that the query filter and the engines look at."""
+    msg = _PARSER.parsebytes(raw)
+    body_part = msg.get_body(preferencelist=("plain", "html"))
+    body = ""
+    if body_part is not None:
+        body = _content(body_part)
+        if body_part.get_content_subtype() == "html":
+            body = html_to_text(body)
+    try:
+        date = parsedate_to_datetime(str(msg["Date"]))
+        date = date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError, IndexError):
+        date = None
+    # Takeout exports carry Gmail's labels and thread id (decimal; the API uses hex)
+    labels = msg.get("X-Gmail-Labels")
+    thrid = str(msg.get("X-GM-THRID") or "").strip()
+    msg_id = str(msg.get("Message-ID") or "").strip().strip("<>") or hashlib.sha1(raw[:65536]).hexdigest()
+    return {
+        "id": msg_id,
+        "threadId": format(int(thrid), "x") if thrid.isdigit() else "",
+        "subject": _clean_text(str(msg.get("Subject") or "")),
+        "from": _clean_text(str(msg.get("From") or "")),
+        "to": str(msg.get("To") or ""),
+        "cc": str(msg.get("Cc") or ""),
+        "labels": [l.strip() for l in str(labels).split(",")] if labels is not None else None,
+        "date": date,
+        "attachments": [p.get_filename() for p in msg.iter_attachments() if p.get_filename()],
+        "body": _clean_text(normalize_body(_clean_text(body), max_tokens)),
+    }
+
+class CsvSink:
+    def __init__(self, path: str):
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=HEADERS)
+        self._w.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._w.writerows(rows)
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+class ParquetSink:
+    """One row group per batch, so nothing but the current batch is held in memory."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead") from None
+        self._pa = pa
+        self._schema = pa.schema([(h, pa.string()) for h in HEADERS])
+        self._w = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            self._w.write_table(self._pa.Table.from_pylist([{h: str(r.get(h, "")) for h in HEADERS} for r in rows], schema=self._schema))
+
+    def close(self) -> None:
+        self._w.close()
+
+def _format_of(path: str, fmt: Optional[str]) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown backfill output format {fmt!r}; use csv or parquet")
+    return fmt
+
+def open_sink(path: str, fmt: Optional[str] = None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return ParquetSink(path) if _format_of(path, fmt) == "parquet" else CsvSink(path)
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    if _format_of(path, fmt) == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+def push_to_sheets(path: str, cfg, fmt: Optional[str] = None, rows_per_call: int = 10000) -> int:
+    """Upserts every row of a backfill output into the tracker sheet (one append_rows per `rows_per_call`)."""
+    from .sheets_writer import SheetBatchWriter, ensure_sheet
+    ws = ensure_sheet(cfg.sheets["spreadsheet_name"], cfg.sheets["worksheet_name"])
+    n = 0
+    with SheetBatchWriter(ws, flush_every=rows_per_call) as writer:
+        for row in read_rows(path, fmt):
+            writer.add(row)
+            n += 1
+    print(f"[BACKFILL] pushed {n} row(s) to {cfg.sheets['spreadsheet_name']}/{cfg.sheets['worksheet_name']}")
+    return n
+
+def backfill(source: str, out: str, cfg, fmt: Optional[str] = None, query: Optional[str] = None,
+             engine_name: Optional[str] = None, batch_size: int = 256, limit: Optional[int] = None,
+             push: bool = False) -> Dict[str, int]:
+    """Streams an mbox / .eml archive through `query` and the engine into a CSV or Parquet file
+    with the tracker's columns. Only one batch of messages is in memory at a time."""
+    tz = pytz.timezone(cfg.app.get("timezone", "UTC"))
+    followup_days = int(cfg.app.get("followup_days", 14))
+    body_budget = (cfg.gmail or {}).get("body_token_budget")
+    matches = compile_query(query if query is not None else cfg.gmail["query"])
+    engine = get_engine(engine_name or (cfg.nlp or {}).get("engine", "transformer"), cfg)
+    result_cache = open_result_cache(cfg.nlp, engine.name, engine.version, engine.config, engine.code_version)
+    sink = open_sink(out, fmt)
+    stats = {"scanned": 0, "matched": 0, "written": 0}
+    seen = set()
+    batch: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        items = [(m["subject"], m["from"], m["body"], (m["date"] or datetime.now(timezone.utc)).astimezone(tz)) for m in batch]
+        parsed_all = parse_cached(result_cache, lambda todo: engine.parse(todo), items)
+        now = datetime.now(tz).isoformat(timespec="seconds")
+        rows = []
+        for m, parsed in zip(batch, parsed_all):
+            applied_dt = parsed["date_applied"]
+            rows.append({
+                "Timestamp": now,
+                "Company": parsed["company"],
+                "Role": parsed["role"],
+                "Date Applied": applied_dt.date().isoformat(),
+                "Status": parsed["status"],
+                "Source": "Email",
+                "EmailId": m["id"],
+                "ThreadId": m["threadId"],
+                "FollowUp Due": (applied_dt + timedelta(days=followup_days)).date().isoformat(),
+                "Notes": "",
+            })
+        with metrics.timer("stage", stage="write"):
+            sink.write(rows)
+        stats["written"] += len(rows)
+        print(f"[BACKFILL] scanned={stats['scanned']} matched={stats['matched']} written={stats['written']}")
+        batch.clear()
+
+    try:
+        for raw in iter_source(source):
+            stats["scanned"] += 1
+            with metrics.timer("extract_text"):
+                m = parse_message(raw, max_tokens=body_budget)
+            if m["id"] in seen or not matches(m):
+                continue
+            seen.add(m["id"])
+            stats["matched"] += 1
+            batch.append(m)
+            if len(batch) >= batch_size:
+                flush()
+            if limit and stats["matched"] >= limit:
+                break
+        if batch:
+            flush()
+    finally:
+        sink.close()
+        if result_cache is not None:
+            result_cache.close()
+    print(f"[BACKFILL] done: {stats['matched']} of {stats['scanned']} message(s) matched; wrote {out}")
+    if push and stats["written"]:
+        push_to_sheets(out, cfg, fmt)
+    return stats
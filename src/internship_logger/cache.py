@@ -0,0 +1,89 @@
+import os, sqlite3, threading
+from typing import Dict, Iterable, Optional
+
+from . import metrics
+
+class DiskCache:
+    """Small SQLite key/value store with least-recently-used eviction past `max_entries`.
+
+    Entries live in one table shared by every namespace; `max_entries` bounds each namespace.
+    """
+
+    def __init__(self, path: str, namespace: str = "default", max_entries: int = 10000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache (ns TEXT, key TEXT, value BLOB, used INTEGER, PRIMARY KEY (ns, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (ns, used)")
+        self._db.commit()
+        row = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM cache WHERE ns = ?", (namespace,)).fetchone()
+        self._clock = int(row[0])
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, value FROM cache WHERE ns = ? AND key IN ({marks})", (self.namespace, *chunk)
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._db.executemany(
+                    "UPDATE cache SET used = ? WHERE ns = ? AND key = ?",
+                    [(self._tick(), self.namespace, k) for k in found],
+                )
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        metrics.inc("cache_lookups", len(found), namespace=self.namespace, result="hit")
+        metrics.inc("cache_lookups", len(keys) - len(found), namespace=self.namespace, result="miss")
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cache (ns, key, value, used) VALUES (?, ?, ?, ?)",
+                [(self.namespace, k, v, self._tick()) for k, v in items.items()],
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM cache WHERE ns = ? AND key IN (SELECT key FROM cache WHERE ns = ? ORDER BY used LIMIT ?)",
+                    (self.namespace, self.namespace, count - self.max_entries),
+                )
+            self._db.commit()
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
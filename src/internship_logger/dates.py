@@ -0,0 +1,126 @@
+import argparse, json, os, re, time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import dateparser
+
+from . import metrics
+
+_MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+          r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+
+# short spans that can hold a date; dateparser only ever sees these, never the whole email
+DATE_SPAN = re.compile(
+    "|".join([
+        rf"\b{_MONTH}\s+{_DAY}(?:,?\s+\d{{4}})?\b",          # March 3, 2025 / Mar 3rd
+        rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}(?:,?\s+\d{{4}})?\b",  # 3 March 2025 / 3rd of March
+        r"\b\d{4}-\d{1,2}-\d{1,2}\b",                          # 2025-03-03
+        r"\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b",                # 03/03/2025, 3.3.25
+        r"\b(?:today|yesterday)\b",
+        r"\b(?:\d+|a|one|two|three|four|five|six|seven)\s+(?:day|week)s?\s+ago\b",
+        r"\blast\s+(?:week|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+    ]),
+    flags=re.I,
+)
+# spans that carry their own year parse the same for every email, so they share one cache
+_HAS_YEAR = re.compile(r"\b\d{4}\b|\d[/.-]\d{1,2}[/.-]\d{2}\b")
+
+DATEPARSER_SETTINGS = {"PREFER_DATES_FROM": "past"}
+LANGUAGES = ["en"]
+MAX_SPANS = 25
+# an application date can't be after the email arrived; year-less dates ("Apr 4") resolve to the
+# past, so far-back hits are usually upcoming deadlines wrapped into last year
+MAX_AGE_DAYS = 365
+MAX_AGE_DAYS_NO_YEAR = 90
+
+@lru_cache(maxsize=8192)
+def _parse_absolute(span: str) -> Optional[datetime]:
+    with metrics.timer("dateparser"):
+        return dateparser.parse(span, languages=LANGUAGES, settings=DATEPARSER_SETTINGS)
+
+@lru_cache(maxsize=2048)
+def _parse_relative(span: str, base: datetime) -> Optional[datetime]:
+    with metrics.timer("dateparser"):
+        return dateparser.parse(span, languages=LANGUAGES, settings=dict(DATEPARSER_SETTINGS, RELATIVE_BASE=base))
+
+def _norm(span: str) -> str:
+    return re.sub(r"\s+", " ", span.strip().lower())
+
+def parse_span(span: str, base: datetime) -> Optional[datetime]:
+    span = _norm(span)
+    if _HAS_YEAR.search(span):
+        return _parse_absolute(span)
+    # "Feb 28" or "yesterday" mean relative to when the email arrived, not to now
+    return _parse_relative(span, datetime(base.year, base.month, base.day))
+
+def find_date_spans(text: str) -> List[str]:
+    return [m.group(0) for m in DATE_SPAN.finditer(text)][:MAX_SPANS]
+
+def extract_date(subject: str, body: str, fallback: datetime, spans: Optional[List[str]] = None) -> datetime:
+    """First plausible application date mentioned in the email, else `fallback` (the received time).
+    `spans` are DATE_SPAN matches found by the caller (rule_engine collects them in its own scan)."""
+    for span in (spans[:MAX_SPANS] if spans is not None else find_date_spans(subject + "\n" + body)):
+        try:
+            dt = parse_span(span, fallback)
+        except Exception:
+            continue
+        if not dt:
+            continue
+        age = (fallback.date() - dt.date()).days
+        limit = MAX_AGE_DAYS if _HAS_YEAR.search(_norm(span)) else MAX_AGE_DAYS_NO_YEAR
+        if -1 <= age <= limit:
+            return dt
+    return fallback
+
+def cache_info() -> Dict[str, Any]:
+    return {"absolute": _parse_absolute.cache_info()._asdict(), "relative": _parse_relative.cache_info()._asdict()}
+
+def _legacy_extract_date(subject: str, body: str, fallback: datetime) -> datetime:
+    # the search_dates-over-everything implementation this module replaced, kept for the benchmark
+    from dateparser.search import search_dates
+    text = subject + "\n" + body
+    try:
+        found = search_dates(text, settings={"PREFER_DATES_FROM": "past"})
+        for _, dt in found or []:
+            if abs((fallback - dt).days) <= 365:
+                return dt
+    except Exception:
+        pass
+    m = re.search(r"(?:on|dated)\s+([A-Za-z0-9, /\-]+)", text, flags=re.I)
+    if m:
+        parsed = dateparser.parse(m.group(1))
+        if parsed:
+            return parsed
+    return fallback
+
+def benchmark(fixtures: List[Dict[str, Any]], repeat: int = 3) -> Dict[str, Any]:
+    """Times the span extractor against the legacy search_dates path and counts same-day agreement."""
+    items = [(r["subject"], r["body"], r["date"]) for r in fixtures]
+    report: Dict[str, Any] = {"n": len(items)}
+    outputs = {}
+    for name, fn in (("legacy", _legacy_extract_date), ("spans", extract_date)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            outputs[name] = [fn(*item) for item in items]
+        report[f"{name}_ms_per_email"] = round((time.perf_counter() - t0) * 1000 / max(1, repeat * len(items)), 3)
+    report["same_day"] = sum(a.date() == b.date() for a, b in zip(outputs["legacy"], outputs["spans"]))
+    report["differences"] = [
+        {"subject": item[0], "legacy": a.date().isoformat(), "spans": b.date().isoformat()}
+        for item, a, b in zip(items, outputs["legacy"], outputs["spans"]) if a.date() != b.date()
+    ]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark span-based date extraction against search_dates")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "..", "..", "tests", "fixtures", "emails.jsonl"))
+    args = parser.parse_args()
+    with open(args.fixtures, "r", encoding="utf-8") as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+    for r in fixtures:
+        r["date"] = datetime.fromisoformat(r["date"])
+    print(json.dumps(benchmark(fixtures), indent=2))
+
+if __name__ == "__main__":
+    main()
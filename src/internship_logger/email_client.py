@@ -1,56 +1,174 @@
-import os, base64, re
-from typing import List, Dict, Any, Optional, Tuple
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import base64, re, random, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 from googleapiclient.errors import HttpError
 
-CREDENTIALS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "credentials")
-CLIENT_SECRET_FILE = os.path.join(CREDENTIALS_DIR, "client_secret.json")
-TOKEN_FILE = os.path.join(CREDENTIALS_DIR, "token.json")
-
-SCOPES = [
-    "https://www.googleapis.com/auth/gmail.readonly",
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-    "https://www.googleapis.com/auth/calendar.events",
-]
-
-def _ensure_creds(scopes: List[str]) -> Credentials:
-    os.makedirs(CREDENTIALS_DIR, exist_ok=True)
-    creds: Optional[Credentials] = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, scopes)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, scopes)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "w", encoding="utf-8") as token:
-            token.write(creds.to_json())
-    return creds
+from . import metrics
+from .google_session import get_session
+from .text_normalize import html_to_text, normalize_body
+
+# gmail rejects batches above 100 calls and recommends <= 50
+MAX_BATCH_SIZE = 100
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
 def get_gmail_service():
-    creds = _ensure_creds(SCOPES)
-    return build("gmail", "v1", credentials=creds)
+    return get_session().service("gmail", "v1")
 
-def search_messages(query: str, max_results: int = 100) -> List[Dict[str, Any]]:
-    service = get_gmail_service()
+def search_messages(query: str, max_results: Optional[int] = None, page_size: int = 500, service=None,
+                    strict: bool = False) -> List[Dict[str, Any]]:
+    """Message refs matching `query`. An API error ends the listing early and returns what was
+    listed so far, or propagates with `strict` (callers that bookmark the mailbox need that)."""
+    service = service or get_gmail_service()
     results: List[Dict[str, Any]] = []
+    page_token = None
     try:
-        resp = service.users().messages().list(userId="me", q=query, maxResults=max_results).execute()
-        if "messages" in resp:
-            results.extend(resp["messages"])
+        while True:
+            size = page_size if max_results is None else min(page_size, max_results - len(results))
+            with metrics.api_call("gmail", "messages.list"):
+                resp = service.users().messages().list(userId="me", q=query, maxResults=size, pageToken=page_token).execute()
+            results.extend(resp.get("messages", []))
+            page_token = resp.get("nextPageToken")
+            if not page_token or (max_results is not None and len(results) >= max_results):
+                break
     except HttpError as e:
+        if strict:
+            raise
         print(f"[Gmail] HttpError: {e}")
     return results
 
+def get_history_id(service=None) -> str:
+    service = service or get_gmail_service()
+    with metrics.api_call("gmail", "getProfile"):
+        return str(service.users().getProfile(userId="me").execute()["historyId"])
+
+def list_added_since(start_history_id: str, service=None) -> Optional[Tuple[List[str], str]]:
+    """Returns (ids of messages added since `start_history_id`, latest historyId), or None once the id has expired."""
+    service = service or get_gmail_service()
+    added: List[str] = []
+    latest = str(start_history_id)
+    page_token = None
+    try:
+        while True:
+            with metrics.api_call("gmail", "history.list"):
+                resp = service.users().history().list(
+                    userId="me", startHistoryId=start_history_id, historyTypes=["messageAdded"], pageToken=page_token
+                ).execute()
+            for h in resp.get("history", []):
+                for rec in h.get("messagesAdded", []):
+                    added.append(rec["message"]["id"])
+            latest = str(resp.get("historyId", latest))
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+    except HttpError as e:
+        if _status_of(e) == 404:
+            return None
+        raise
+    return list(dict.fromkeys(added)), latest
+
+def sync_messages(query: str, history_id: Optional[str] = None, since: Optional[int] = None,
+                  service=None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Returns (message refs matching `query` that need a look, new mailbox historyId).
+
+    Without a usable `history_id` this is a paginated full scan. Otherwise only messages the
+    history API reports as added are considered, narrowed to the query with one `after:` listing
+    (`since` is the unix time of the previous sync). If any listing call fails the result is
+    ([], None): a partial listing must not move the sync point past mail it never saw.
+    """
+    service = service or get_gmail_service()
+    try:
+        return _sync(query, history_id, since, service)
+    except HttpError as e:
+        print(f"[Gmail] listing failed, keeping the previous sync point: {e}")
+        return [], None
+
+def _sync(query: str, history_id: Optional[str], since: Optional[int], service) -> Tuple[List[Dict[str, Any]], str]:
+    if history_id:
+        delta = list_added_since(history_id, service=service)
+        if delta is None:
+            print("[Gmail] historyId expired; falling back to a full scan")
+        else:
+            added, latest = delta
+            if not added:
+                return [], latest
+            narrowed = f"({query})" if since is None else f"({query}) after:{max(0, int(since) - 86400)}"
+            wanted = set(added)
+            return [r for r in search_messages(narrowed, service=service, strict=True) if r["id"] in wanted], latest
+    # read the history id first so anything arriving mid-scan is picked up next time
+    latest = get_history_id(service=service)
+    return search_messages(query, service=service, strict=True), latest
+
 def get_message(msg_id: str) -> Dict[str, Any]:
     service = get_gmail_service()
     return service.users().messages().get(userId="me", id=msg_id, format="full").execute()
 
+def _status_of(err: Exception) -> int:
+    resp = getattr(err, "resp", None)
+    return int(getattr(resp, "status", 0) or 0)
+
+def _fetch_batch(service, ids: List[str], fmt: str, http, max_retries: int, backoff: float,
+                 metadata_headers: Optional[List[str]] = None) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    pending = list(ids)
+    for attempt in range(max_retries + 1):
+        retry: List[str] = []
+        def _cb(request_id, response, exception):
+            if exception is None:
+                out[request_id] = response
+            elif _status_of(exception) in RETRYABLE_STATUS:
+                retry.append(request_id)
+            else:
+                print(f"[Gmail] HttpError for {request_id}: {exception}")
+        batch = service.new_batch_http_request(callback=_cb)
+        extra = {"metadataHeaders": metadata_headers} if fmt == "metadata" and metadata_headers else {}
+        for msg_id in pending:
+            batch.add(service.users().messages().get(userId="me", id=msg_id, format=fmt, **extra), request_id=msg_id)
+        try:
+            with metrics.api_call("gmail", "messages.get" if fmt == "full" else f"messages.get:{fmt}", n=len(pending)):
+                batch.execute(http=http)
+        except HttpError as e:
+            if _status_of(e) not in RETRYABLE_STATUS:
+                print(f"[Gmail] batch HttpError: {e}")
+                return out
+            retry = [i for i in pending if i not in out]
+        if not retry:
+            return out
+        pending = retry
+        metrics.inc("google_api_retries", len(retry), api="gmail")
+        if attempt < max_retries and backoff:
+            time.sleep(min(32.0, backoff * (2 ** attempt)) + random.uniform(0, backoff))
+    print(f"[Gmail] giving up on {len(pending)} message(s) after {max_retries} retries")
+    return out
+
+def get_messages(ids: Iterable[str], batch_size: int = 50, format: str = "full", max_workers: int = 4,
+                 max_retries: int = 5, backoff: float = 0.5, service=None, http=None,
+                 metadata_headers: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Fetches many messages through Gmail batch requests, in the order of `ids`.
+
+    Up to `max_workers` batches are in flight at once; calls answered with 429/5xx are
+    retried with exponential backoff. Messages that still fail are left out of the result.
+    `service`/`http` let callers (and tests) supply their own client and transport;
+    `metadata_headers` limits the headers returned with format="metadata".
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    service = service or get_gmail_service()
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    chunks = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+    def _run(chunk):
+        if http is not None:
+            return _fetch_batch(service, chunk, format, http, max_retries, backoff, metadata_headers)
+        with get_session().http() as pooled:
+            return _fetch_batch(service, chunk, format, pooled, max_retries, backoff, metadata_headers)
+
+    fetched: Dict[str, Any] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for part in pool.map(_run, chunks):
+            fetched.update(part)
+    return [fetched[i] for i in ids if i in fetched]
+
 def _get_header(headers: List[Dict[str, str]], name: str) -> str:
     for h in headers:
         if h.get("name", "").lower() == name.lower():
@@ -70,36 +188,46 @@ def _clean_text(s: str) -> str:
     s = re.sub(r"\s+\n", "\n", s)
     return s.strip()
 
-def extract_plain_text(message: Dict[str, Any]) -> Tuple[str, str, str]:
-    """Returns: (subject, from_email, text)"""
+def _body_parts(part: Dict[str, Any], out: Dict[str, List[str]]) -> None:
+    # within multipart/alternative the html part is a rendering of the plain one, so only
+    # one of them is kept; mixed/related parts (attachments, inline bodies) are walked in full
+    mime = part.get("mimeType", "")
+    if "parts" in part:
+        if mime == "multipart/alternative":
+            alt: Dict[str, List[str]] = {"plain": [], "html": []}
+            for p in part["parts"]:
+                _body_parts(p, alt)
+            out["plain" if alt["plain"] else "html"].extend(alt["plain"] or alt["html"])
+        else:
+            for p in part["parts"]:
+                _body_parts(p, out)
+        return
+    data = part.get("body", {}).get("data")
+    if data and mime == "text/plain":
+        out["plain"].append(_decode_payload(data))
+    elif data and mime == "text/html":
+        out["html"].append(html_to_text(_decode_payload(data)))
+
+def extract_plain_text(message: Dict[str, Any], max_tokens: Optional[int] = None) -> Tuple[str, str, str]:
+    """Returns: (subject, from_email, text). The text has quoted replies, signatures and ATS/legal
+    boilerplate removed and is cut to about `max_tokens` words when a budget is given."""
     payload = message.get("payload", {})
     headers = payload.get("headers", [])
     subject = _get_header(headers, "Subject")
     from_email = _get_header(headers, "From")
 
-    body_text = ""
-    def traverse(parts):
-        nonlocal body_text
-        for p in parts:
-            mime = p.get("mimeType", "")
-            if "parts" in p:
-                traverse(p["parts"])
-            elif mime == "text/plain" and "data" in p.get("body", {}):
-                body_text += _decode_payload(p["body"]["data"]) + "\n"
-            elif mime == "text/html" and "data" in p.get("body", {}):
-                html = _decode_payload(p["body"]["data"])
-                text = re.sub("<[^<]+?>", " ", html)
-                body_text += text + "\n"
-
     if "parts" in payload:
-        traverse(payload["parts"])
+        parts: Dict[str, List[str]] = {"plain": [], "html": []}
+        _body_parts(payload, parts)
+        body_text = "\n".join(parts["plain"] or parts["html"])
     else:
-        body = payload.get("body", {})
-        if "data" in body:
-            body_text = _decode_payload(body["data"])
+        data = payload.get("body", {}).get("data")
+        body_text = _decode_payload(data) if data else ""
+        if data and payload.get("mimeType") == "text/html":
+            body_text = html_to_text(body_text)
 
     # clean
     subject = _clean_text(subject)
     from_email = _clean_text(from_email)
-    body_text = _clean_text(body_text)
+    body_text = _clean_text(normalize_body(_clean_text(body_text), max_tokens))
     return subject, from_email, body_text
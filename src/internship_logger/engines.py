@@ -0,0 +1,229 @@
+import gc, importlib, json, threading, time
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from . import metrics
+
+# items are (subject, from_header, body, fallback_date); engines return one
+# {"status", "company", "role", "date_applied"} dict per item, in order
+Item = Tuple[str, str, str, Any]
+
+# seconds spent importing each engine module, for the startup report
+IMPORT_TIMES: Dict[str, float] = {}
+
+def _import(module: str):
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module, __package__)
+    IMPORT_TIMES.setdefault(module, time.perf_counter() - t0)
+    return mod
+
+class Engine:
+    """Base for NLP engines. Constructing one is cheap: `version`/`config` come from settings
+    alone, and the engine module and its models are imported/loaded on the first parse."""
+
+    name = ""
+    # bump when the engine's extraction code or result schema changes (shared rule/date code
+    # counts for every engine that uses it), so the result cache stops serving older output
+    code_version = "1"
+
+    def __init__(self, cfg):
+        self.config: Dict[str, Any] = {}
+        self.version = self.name
+        self.loaded = False
+        nlp = getattr(cfg, "nlp", None) or {}
+        self.workers = int(nlp.get("workers") or 1)
+        self.worker_threads = nlp.get("worker_threads")
+        self.worker_chunk_size = nlp.get("worker_chunk_size")
+        self._pool = None
+
+    def _load(self) -> None:
+        pass
+
+    def _unload(self) -> None:
+        pass
+
+    def _parse(self, items: List[Item]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _after_fork(self) -> None:
+        """Runs in each inference worker: drop state that must not cross a fork (db handles, nested pools)."""
+
+    def load(self) -> None:
+        if self.loaded:
+            return
+        t0 = time.perf_counter()
+        self._load()
+        self.loaded = True
+        metrics.observe("engine_load", time.perf_counter() - t0, engine=self.name)
+        rss_mb = metrics.peak_rss_mb()
+        imports = " ".join(f"{m.lstrip('.')}={s:.2f}s" for m, s in IMPORT_TIMES.items())
+        print(f"[STARTUP] engine={self.name} load={time.perf_counter() - t0:.2f}s imports: {imports or '-'} peak_rss={rss_mb:.0f}MB")
+
+    def unload(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.loaded:
+            self._unload()
+            self.loaded = False
+
+    def parse(self, items: List[Item]) -> List[Dict[str, Any]]:
+        if not items:
+            return []
+        self.load()
+        metrics.inc("engine_items", len(items), engine=self.name)
+        with metrics.timer("engine_parse", engine=self.name):
+            pool = self._worker_pool() if len(items) > 1 else None
+            return pool.parse(items) if pool else self._parse(items)
+
+    def prepare(self) -> None:
+        """Loads the engine and forks its worker pool now. Call from the main thread before any
+        fetch/infer threads start: forking while another thread holds a lock (SSL, stdout, the
+        session) can deadlock the children."""
+        if self.workers > 1:
+            self.load()
+            self._worker_pool()
+
+    def _worker_pool(self):
+        # forked after load(), so the workers inherit the loaded models
+        if self.workers <= 1:
+            return None
+        if self._pool is None:
+            if threading.current_thread() is not threading.main_thread():
+                print("[NLP] nlp.workers: the pool must be forked from the main thread (Engine.prepare); running inference in-process")
+                self.workers = 1
+                return None
+            pool_mod = _import(".nlp_pool")
+            if not pool_mod.fork_available():
+                print("[NLP] nlp.workers needs the fork start method; running inference in-process")
+                self.workers = 1
+                return None
+            self._pool = pool_mod.WorkerPool(self, self.workers, self.worker_threads, self.worker_chunk_size)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def settings_key(self) -> str:
+        """Everything from settings that shapes this instance; get_engine rebuilds it when this changes."""
+        return json.dumps([self.version, self.config, self.workers, self.worker_threads, self.worker_chunk_size,
+                           getattr(self, "cascade", None)], sort_keys=True, default=str)
+
+class RulesEngine(Engine):
+    name = "rules"
+    code_version = "1"
+
+    def _load(self) -> None:
+        self._rules = _import(".nlp_rules")
+
+    def _parse(self, items: List[Item]) -> List[Dict[str, Any]]:
+        r = self._rules
+        out = []
+        for subject, from_email, body, fallback in items:
+            # one scan of the email gives status, company, role and the date candidates
+            res = r.RULES.analyze(subject, from_email, body)
+            del res["confidence"]
+            res["date_applied"] = r.extract_date_applied(subject, body, fallback, res.pop("date_spans"))
+            out.append(res)
+        return out
+
+class SpacyEngine(Engine):
+    name = "spacy"
+    code_version = "1"
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.config = dict(cfg.nlp_spacy or {})
+        self.version = str(self.config.get("spacy_model", "en_core_web_md"))
+
+    def _load(self) -> None:
+        self._mod = _import(".nlp_spacy")
+        synonyms = self.config.get("role_synonyms", ["software","data","ml","ai"])
+        self._nlp = self._mod.build_spacy(self.version, synonyms)
+
+    def _unload(self) -> None:
+        self._nlp = None
+        gc.collect()
+
+    def _after_fork(self) -> None:
+        # daemonic pool workers can't start spaCy's own worker processes
+        self.config = dict(self.config, n_process=1)
+
+    def _parse(self, items: List[Item]) -> List[Dict[str, Any]]:
+        return self._mod.parse_emails(self._nlp, items, batch_size=int(self.config.get("batch_size", 64)),
+                                      n_process=int(self.config.get("n_process", 1)))
+
+class TransformerEngine(Engine):
+    name = "transformer"
+    code_version = "1"
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.config = dict(cfg.nlp_transformer or {})
+        self.cascade = (cfg.nlp or {}).get("cascade")
+        self.version = "|".join([
+            self.config.get("zero_shot_model", "facebook/bart-large-mnli"),
+            self.config.get("ner_model", "dslim/bert-base-NER"),
+            self.config.get("embed_model", "sentence-transformers/all-MiniLM-L6-v2"),
+        ])
+
+    def _load(self) -> None:
+        self._mod = _import(".nlp_xfmr")
+        self._mod._ensure_models(*self._mod._model_names(self.config), self._mod.backend_options(self.config))
+
+    def _unload(self) -> None:
+        self._mod.unload_models()
+        gc.collect()
+
+    def _after_fork(self) -> None:
+        # the embedding cache's sqlite connection belongs to the parent; workers open their own
+        self._mod._EMB_CACHE = None
+
+    def _parse(self, items: List[Item]) -> List[Dict[str, Any]]:
+        return self._mod.parse_emails_transformer(self.config, items, cascade=self.cascade)
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = {t: int(metrics.METRICS.count("cascade_resolved", tier=t)) for t in ("rules", "zero_shot")}
+        return tiers if any(tiers.values()) else {}
+
+# name -> Engine subclass, or a "package.module:Class" path imported on first use.
+# Adding an engine is one register_engine() call; process_once never branches on names.
+_REGISTRY: Dict[str, Union[Callable[[Any], Engine], str]] = {
+    "rules": RulesEngine,
+    "spacy": SpacyEngine,
+    "transformer": TransformerEngine,
+}
+_INSTANCES: Dict[str, Engine] = {}
+
+def register_engine(name: str, factory: Union[Callable[[Any], Engine], str]) -> None:
+    _REGISTRY[name] = factory
+    _INSTANCES.pop(name, None)
+
+def available_engines() -> List[str]:
+    return sorted(_REGISTRY)
+
+def get_engine(name: str, cfg) -> Engine:
+    """The (possibly still unloaded) engine registered as `name`. The instance, with its loaded
+    models, is reused while its settings stay the same; after an edit to the nlp settings (e.g.
+    config.yaml changed under --watch) the old one is unloaded and a new one built."""
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown nlp engine {name!r}; choose one of {', '.join(available_engines())}")
+    factory = _REGISTRY[name]
+    if isinstance(factory, str):
+        module, _, attr = factory.partition(":")
+        factory = getattr(_import(module), attr)
+    fresh, current = factory(cfg), _INSTANCES.get(name)
+    if current is not None and current.settings_key() == fresh.settings_key():
+        return current
+    if current is not None:
+        print(f"[NLP] engine={name} settings changed; reloading")
+        current.unload()
+    _INSTANCES[name] = fresh
+    return fresh
+
+def loaded_engines() -> List[str]:
+    return sorted(name for name, engine in _INSTANCES.items() if engine.loaded)
+
+def unload_engines() -> None:
+    for engine in _INSTANCES.values():
+        engine.unload()
+    gc.collect()
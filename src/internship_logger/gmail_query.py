@@ -0,0 +1,136 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# a message as the evaluator sees it: subject/from/to/body strings, labels (None = unknown,
+# e.g. plain .eml files), date (aware datetime), attachments (file names)
+Fields = Dict[str, Any]
+Predicate = Callable[[Fields], bool]
+
+_TOKEN = re.compile(r'"[^"]*"|[(){}]|-(?=\S)|[A-Za-z_]+:(?=\S)|[^\s(){}"]+')
+_AGE_UNITS = {"d": 1, "m": 30, "y": 365}
+_HEADER_FIELDS = ("from", "to", "cc", "bcc", "subject")
+
+class QueryError(ValueError):
+    pass
+
+def _tokens(query: str) -> List[str]:
+    return _TOKEN.findall(query or "")
+
+def _text(fields: Fields) -> str:
+    hay = fields.get("_haystack")
+    if hay is None:
+        hay = fields["_haystack"] = "\n".join(str(fields.get(k) or "") for k in ("subject", "from", "to", "body")).lower()
+    return hay
+
+def _parse_when(value: str) -> datetime:
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), tz=timezone.utc)
+    try:
+        return datetime.strptime(value.replace("-", "/"), "%Y/%m/%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise QueryError(f"bad date {value!r}; use YYYY/MM/DD or unix seconds") from None
+
+def _term(field: Optional[str], value: str, now: datetime) -> Predicate:
+    """One `field:value` (or bare text when field is None) as a predicate."""
+    v = value.strip('"').lower()
+    if field is None:
+        return lambda f: v in _text(f)
+    if field in _HEADER_FIELDS:
+        return lambda f: v in str(f.get(field) or "").lower()
+    if field in ("in", "label"):
+        if v in ("anywhere", "all"):
+            return lambda f: True
+        # labels we can't see (plain .eml) don't exclude anything
+        return lambda f: f.get("labels") is None or v in {l.lower() for l in f["labels"]}
+    if field in ("newer_than", "older_than"):
+        m = re.fullmatch(r"(\d+)([dmy])", v)
+        if not m:
+            raise QueryError(f"bad {field} value {value!r}")
+        cutoff = now - timedelta(days=int(m.group(1)) * _AGE_UNITS[m.group(2)])
+        if field == "newer_than":
+            return lambda f: f.get("date") is None or f["date"] >= cutoff
+        return lambda f: f.get("date") is None or f["date"] < cutoff
+    if field in ("after", "before"):
+        when = _parse_when(v)
+        if field == "after":
+            return lambda f: f.get("date") is None or f["date"] >= when
+        return lambda f: f.get("date") is None or f["date"] < when
+    if field == "has" and v == "attachment":
+        return lambda f: bool(f.get("attachments"))
+    if field == "filename":
+        return lambda f: any(v in name.lower() for name in f.get("attachments") or [])
+    # is:, category:, has:drive and the like need server-side state; they never filter locally
+    return lambda f: True
+
+class _Parser:
+    """Gmail search syntax: implicit AND, OR (binds tighter than AND), -negation, ( ) groups,
+    { } OR-groups, quoted phrases and field:value / field:(group) operators."""
+
+    def __init__(self, query: str, now: datetime):
+        self.toks = _tokens(query)
+        self.pos = 0
+        self.now = now
+
+    def _peek(self) -> Optional[str]:
+        return self.toks[self.pos] if self.pos < len(self.toks) else None
+
+    def _next(self) -> str:
+        tok = self._peek()
+        if tok is None:
+            raise QueryError("unexpected end of query")
+        self.pos += 1
+        return tok
+
+    def parse(self) -> Predicate:
+        pred = self._and(None, closer=None)
+        if self._peek() is not None:
+            raise QueryError(f"unexpected {self._peek()!r}")
+        return pred
+
+    def _and(self, field: Optional[str], closer: Optional[str]) -> Predicate:
+        parts: List[Predicate] = []
+        while self._peek() not in (None, closer, ")", "}"):
+            if self._peek() == "AND":
+                self._next()
+                continue
+            parts.append(self._or(field))
+        if closer is not None and self._next() != closer:
+            raise QueryError(f"expected {closer!r}")
+        return lambda f: all(p(f) for p in parts)
+
+    def _or(self, field: Optional[str]) -> Predicate:
+        parts = [self._unary(field)]
+        while self._peek() == "OR":
+            self._next()
+            parts.append(self._unary(field))
+        return parts[0] if len(parts) == 1 else (lambda f: any(p(f) for p in parts))
+
+    def _unary(self, field: Optional[str]) -> Predicate:
+        if self._peek() == "-":
+            self._next()
+            inner = self._unary(field)
+            return lambda f: not inner(f)
+        return self._atom(field)
+
+    def _atom(self, field: Optional[str]) -> Predicate:
+        tok = self._next()
+        if tok == "(":
+            return self._and(field, closer=")")
+        if tok == "{":
+            parts: List[Predicate] = []
+            while self._peek() not in (None, "}"):
+                parts.append(self._unary(field))
+            self._next()
+            return lambda f: any(p(f) for p in parts)
+        if tok.endswith(":") and not tok.startswith('"'):
+            op = tok[:-1].lower()
+            if self._peek() in ("(", "{"):
+                return self._atom(op)
+            return _term(op, self._next(), self.now)
+        return _term(field, tok, self.now)
+
+def compile_query(query: str, now: Optional[datetime] = None) -> Predicate:
+    """A predicate that answers `query` for one message's Fields, the way Gmail search would
+    as far as it can tell offline (server-only operators like is:unread always match)."""
+    return _Parser(query, now or datetime.now(timezone.utc)).parse()
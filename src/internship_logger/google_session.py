@@ -0,0 +1,132 @@
+import contextlib, functools, os, threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+CREDENTIALS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "credentials")
+CLIENT_SECRET_FILE = os.path.join(CREDENTIALS_DIR, "client_secret.json")
+TOKEN_FILE = os.path.join(CREDENTIALS_DIR, "token.json")
+
+# one consent covers every API the logger talks to, so all modules share a single token
+SCOPES = [
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/calendar.events",
+]
+
+class GoogleSession:
+    """Credentials, discovery clients and HTTP transports shared by Gmail, Calendar and Sheets.
+
+    token.json is read once; refreshes are serialized, so concurrent callers (fetch workers,
+    the gspread session, the calendar client) never race to refresh or rewrite the token.
+    Discovery clients come from the documents bundled with google-api-python-client
+    (static_discovery), so building one costs no network round trip.
+    """
+
+    def __init__(self, scopes: Optional[List[str]] = None, token_file: str = TOKEN_FILE,
+                 client_secret_file: str = CLIENT_SECRET_FILE, credentials=None, timeout: Optional[float] = 60):
+        self.scopes = list(scopes or SCOPES)
+        self.token_file = token_file
+        self.client_secret_file = client_secret_file
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._creds = self._guard(credentials) if credentials is not None else None
+        self._services: Dict[Tuple[str, str], Any] = {}
+        self._gspread = None
+        self._idle_http: List[Any] = []
+
+    def _save(self, creds) -> None:
+        if self.token_file and hasattr(creds, "to_json"):
+            os.makedirs(os.path.dirname(os.path.abspath(self.token_file)), exist_ok=True)
+            tmp = self.token_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(creds.to_json())
+            os.replace(tmp, self.token_file)
+
+    def _guard(self, creds):
+        # google-auth transports call creds.refresh() on their own when a token expires; wrap it
+        # so only the first caller refreshes and the rest reuse its token
+        refresh = creds.refresh
+        @functools.wraps(refresh)
+        def _locked_refresh(request):
+            with self._lock:
+                if getattr(creds, "valid", False):
+                    return
+                refresh(request)
+                self._save(creds)
+        creds.refresh = _locked_refresh
+        return creds
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                creds = None
+                if os.path.exists(self.token_file):
+                    creds = Credentials.from_authorized_user_file(self.token_file, self.scopes)
+                if not creds or not (creds.valid or (creds.expired and creds.refresh_token)):
+                    flow = InstalledAppFlow.from_client_secrets_file(self.client_secret_file, self.scopes)
+                    creds = flow.run_local_server(port=0)
+                    self._save(creds)
+                self._creds = self._guard(creds)
+            if not self._creds.valid:
+                self._creds.refresh(Request())
+            return self._creds
+
+    def _authorized_http(self):
+        return google_auth_httplib2.AuthorizedHttp(self.credentials(), http=httplib2.Http(timeout=self.timeout))
+
+    @contextlib.contextmanager
+    def http(self) -> Iterator[Any]:
+        """Checks out an authorized transport for one request or batch (httplib2.Http is not
+        thread-safe) and returns it to an idle pool afterwards, so its keep-alive connections
+        are reused by the next batch whichever thread runs it."""
+        with self._lock:
+            http = self._idle_http.pop() if self._idle_http else None
+        if http is None:
+            http = self._authorized_http()
+        try:
+            yield http
+        finally:
+            with self._lock:
+                self._idle_http.append(http)
+
+    def service(self, api: str, version: str):
+        """A discovery client for `api`, built once. Its own transport serves plain `.execute()`
+        calls; execute from worker threads with a transport from `session.http()`."""
+        key = (api, version)
+        with self._lock:
+            if key not in self._services:
+                self._services[key] = build(api, version, http=self._authorized_http(), static_discovery=True,
+                                            cache_discovery=False)
+            return self._services[key]
+
+    def gspread_client(self):
+        import gspread
+        with self._lock:
+            if self._gspread is None:
+                sa_path = os.getenv("GSPREAD_SERVICE_ACCOUNT_JSON", "").strip()
+                self._gspread = gspread.service_account(filename=sa_path) if sa_path else gspread.authorize(self.credentials())
+            return self._gspread
+
+_SESSION: Optional[GoogleSession] = None
+_SESSION_LOCK = threading.Lock()
+
+def get_session() -> GoogleSession:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = GoogleSession()
+        return _SESSION
+
+def set_session(session: Optional[GoogleSession]) -> Optional[GoogleSession]:
+    """Installs `session` process-wide (None resets to a lazily created default); returns the previous one."""
+    global _SESSION
+    with _SESSION_LOCK:
+        previous, _SESSION = _SESSION, session
+        return previous
@@ -1,108 +1,248 @@
 import argparse
+import contextlib
+import time
+from typing import Optional
 from datetime import datetime, timedelta, timezone
 import pytz
 
-from .settings import load_settings, load_state, save_state
-from .email_client import search_messages, get_message, extract_plain_text
-# fallback import
-from .nlp_rules import classify_status as classify_status_rules, extract_company as extract_company_rules, extract_role as extract_role_rules, extract_date_applied as extract_date_rules
-# spaCy + transformer
-from .nlp_spacy import build_spacy, parse_email as parse_email_spacy
-from .nlp_xfmr import parse_email_transformer
-
-_SPACY_NLP = None
-
-def _ensure_spacy(cfg):
-    global _SPACY_NLP
-    if _SPACY_NLP is None:
-        model = (cfg.nlp_spacy or {}).get("spacy_model", "en_core_web_md")
-        synonyms = (cfg.nlp_spacy or {}).get("role_synonyms", ["software","data","ml","ai"])
-        _SPACY_NLP = build_spacy(model, synonyms)
-    return _SPACY_NLP
-
-def process_once(dry_run: bool = False) -> None:
+from . import metrics
+from .settings import load_settings, resolve_path
+from .state_store import open_state_store
+from .result_cache import open_result_cache, parse_cached
+from .pipeline import run_serial, run_staged
+from .email_client import search_messages, sync_messages, get_messages, extract_plain_text
+from .engines import get_engine, available_engines
+from .applications import application_row, load_index, summarize
+from .triage import TRIAGE_HEADERS, TRIAGE_VERSION, triage
+
+def process_once(dry_run: bool = False, serial: bool = False, engine_name: Optional[str] = None) -> int:
+    """One sync + parse + write pass; returns how many new messages were processed."""
     cfg = load_settings()
-    state = load_state()
+    metrics.METRICS.reset()
+    run_t0 = time.perf_counter()
+    store = open_state_store(cfg.app)
     tz = pytz.timezone(cfg.app.get("timezone", "UTC"))
 
     query = cfg.gmail["query"]
-    msg_refs = search_messages(query=query, max_results=200)
-
-    ws = __import__(".".join(["src","internship_logger","sheets_writer"]), fromlist=["ensure_sheet"]).ensure_sheet(
-        cfg.sheets["spreadsheet_name"], cfg.sheets["worksheet_name"]
-    )
-    upsert_row = __import__(".".join(["src","internship_logger","sheets_writer"]), fromlist=["upsert_row"]).upsert_row
-
-    processed_ids = set(state.get("processed_ids", []))
-    engine = (cfg.nlp or {}).get("engine", "transformer")
-
-    if engine == "spacy":
-        nlp = _ensure_spacy(cfg)
-
-    for ref in msg_refs:
-        msg_id = ref["id"]
-        if msg_id in processed_ids:
-            continue
-        msg = get_message(msg_id)
-        internal_date_ms = int(msg.get("internalDate", "0"))
-        internal_dt = datetime.fromtimestamp(internal_date_ms / 1000, tz=timezone.utc).astimezone(tz)
-
-        subject, from_email, body = extract_plain_text(msg)
-
-        if engine == "transformer":
-            parsed = parse_email_transformer(getattr(cfg, "nlp_transformer", {}), subject, from_email, body, internal_dt)
-            status = parsed["status"]; company = parsed["company"]; role = parsed["role"]; applied_dt = parsed["date_applied"]
-        elif engine == "spacy":
-            parsed = parse_email_spacy(nlp, subject, from_email, body, internal_dt)
-            status = parsed["status"]; company = parsed["company"]; role = parsed["role"]; applied_dt = parsed["date_applied"]
+    gm = cfg.gmail or {}
+    sync_started = int(time.time())
+    history_id = None
+    with metrics.timer("stage", stage="sync"):
+        if gm.get("sync", "incremental") == "incremental":
+            msg_refs, history_id = sync_messages(query, store.get("history_id"), store.get("last_sync"))
         else:
-            status = classify_status_rules(subject, body)
-            company = extract_company_rules(subject, from_email, body)
-            role = extract_role_rules(subject, body)
-            applied_dt = extract_date_rules(subject, body, internal_dt)
-
-        followup_days = int(cfg.app.get("followup_days", 14))
-        followup_dt = applied_dt + timedelta(days=followup_days)
-
-        row = {
-            "Timestamp": datetime.now(tz).isoformat(timespec="seconds"),
-            "Company": company,
-            "Role": role,
-            "Date Applied": applied_dt.date().isoformat(),
-            "Status": status,
-            "Source": "Email",
-            "EmailId": msg_id,
-            "ThreadId": msg.get("threadId", ""),
-            "FollowUp Due": followup_dt.date().isoformat(),
-            "Notes": "",
-        }
-        print(f"[PROCESS] {company} | {role} | {status} | applied {applied_dt.date()} | follow-up {followup_dt.date()}")
-
-        upsert_row(ws, row)
-
-        if cfg.calendar.get("enabled", True):
-            from .reminder import create_followup_event
-            create_followup_event(
+            msg_refs = search_messages(query=query)
+
+    new_ids = store.unprocessed(ref["id"] for ref in msg_refs)
+    # an idle poll skips the sheet round trips and the result cache (engines only load on first parse);
+    # the sheet is opened on the first chunk with something to write, so all-skipped polls never touch it
+    writer = result_cache = None
+
+    def sheet_writer():
+        nonlocal writer
+        if writer is None:
+            with metrics.timer("stage", stage="open_sheet"):
+                ws = __import__(".".join(["src","internship_logger","sheets_writer"]), fromlist=["ensure_sheet"]).ensure_sheet(
+                    cfg.sheets["spreadsheet_name"], cfg.sheets["worksheet_name"]
+                )
+                SheetBatchWriter = __import__(".".join(["src","internship_logger","sheets_writer"]), fromlist=["SheetBatchWriter"]).SheetBatchWriter
+                writer = SheetBatchWriter(ws, flush_every=int(cfg.sheets.get("flush_every", 200)))
+        return writer
+    apps = load_index(store) if new_ids and cfg.sheets.get("merge_applications", True) else None
+
+    engine = get_engine(engine_name or (cfg.nlp or {}).get("engine", "transformer"), cfg)
+    if new_ids:
+        result_cache = open_result_cache(cfg.nlp, engine.name, engine.version, engine.config, engine.code_version)
+        # fork inference workers (nlp.workers) before the pipeline starts its threads
+        engine.prepare()
+    followup_days = int(cfg.app.get("followup_days", 14))
+    calendar_on = cfg.calendar.get("enabled", True)
+    # each chunk is fetched, parsed, written to Sheets/Calendar and committed as a unit,
+    # so a crash only repeats the chunks in flight
+    chunk_size = max(1, int(cfg.app.get("state_commit_every", 25)))
+
+    chunks = [new_ids[i:i + chunk_size] for i in range(0, len(new_ids), chunk_size)]
+    fetched_count = deferred = 0
+
+    tc = gm.get("triage") or {}
+
+    def fetch(ids):
+        opts = {"batch_size": int(gm.get("batch_size", 50)), "max_workers": int(gm.get("max_workers", 4))}
+        skipped = []
+        if tc.get("enabled", True):
+            # headers + snippet first; only messages that look like application mail are downloaded in full
+            metas = get_messages(ids, format="metadata", metadata_headers=TRIAGE_HEADERS, **opts)
+            ids, skipped = triage(metas, min_score=int(tc.get("min_score", 0)))
+        return get_messages(ids, **opts), skipped
+
+    body_budget = gm.get("body_token_budget")
+
+    def infer(fetched):
+        chunk, skipped = fetched
+        items = []
+        for msg in chunk:
+            internal_date_ms = int(msg.get("internalDate", "0"))
+            internal_dt = datetime.fromtimestamp(internal_date_ms / 1000, tz=timezone.utc).astimezone(tz)
+            with metrics.timer("extract_text"):
+                subject, from_email, body = extract_plain_text(msg, max_tokens=body_budget)
+            items.append((subject, from_email, body, internal_dt))
+        return chunk, parse_cached(result_cache, lambda todo: engine.parse(todo), items), skipped
+
+    def write(parsed_chunk):
+        nonlocal fetched_count, deferred
+        chunk, parsed_all, skipped = parsed_chunk
+        fetched_count += len(chunk) + len(skipped)
+        writer = sheet_writer() if chunk else None
+        followups = []
+        app_of, queued, changes = {}, set(), []
+        now = datetime.now(tz).isoformat(timespec="seconds")
+        for msg, parsed in zip(chunk, parsed_all):
+            msg_id = msg["id"]
+            status = parsed["status"]; company = parsed["company"]; role = parsed["role"]; applied_dt = parsed["date_applied"]
+            followup_dt = applied_dt + timedelta(days=followup_days)
+            print(f"[PROCESS] {company} | {role} | {status} | applied {applied_dt.date()} | follow-up {followup_dt.date()}")
+
+            if apps is not None:
+                # later emails about the same application rewrite its row instead of adding one
+                rec, change = apps.update(msg_id, msg.get("threadId", ""), parsed)
+                app_of[msg_id] = rec["id"]
+                changes.append(change)
+                writer.add(application_row(rec, followup_days, now))
+                if not rec["followup"] and rec["status"] not in ("Offer", "Rejected") and rec["id"] not in queued:
+                    queued.add(rec["id"])
+                    followups.append({"company": rec["company"], "role": rec["role"], "email_id": rec["id"],
+                                      "followup_dt": datetime.fromisoformat(rec["date_applied"]) + timedelta(days=followup_days)})
+                continue
+
+            row = {
+                "Timestamp": now,
+                "Company": company,
+                "Role": role,
+                "Date Applied": applied_dt.date().isoformat(),
+                "Status": status,
+                "Source": "Email",
+                "EmailId": msg_id,
+                "ThreadId": msg.get("threadId", ""),
+                "FollowUp Due": followup_dt.date().isoformat(),
+                "Notes": "",
+            }
+            writer.add(row)
+            followups.append({"company": company, "role": role, "followup_dt": followup_dt, "email_id": msg_id})
+
+        if writer is not None:
+            writer.flush()
+        if changes:
+            print(f"[APPS] {summarize(changes)} ({len(apps)} applications tracked)")
+
+        failed = set()
+        if calendar_on and followups:
+            from .reminder import create_followup_events
+            results = create_followup_events(
                 calendar_id=cfg.calendar.get("calendar_id", "primary"),
-                company=company,
-                role=role,
-                followup_dt=followup_dt,
-                email_id=msg_id,
+                items=followups,
                 dry_run=dry_run or bool(cfg.app.get("dry_run", False)),
             )
+            failed = {r["email_id"] for r in results if r["status"] == "error"}
+            if failed:
+                # leave them unprocessed; the next run retries and event ids keep that idempotent
+                print(f"[Calendar] {len(failed)} follow-up(s) failed: {', '.join(sorted(failed))}")
+            if apps is not None:
+                for r in results:
+                    if r["status"] in ("created", "updated"):
+                        apps.mark_followup(r["email_id"])
+
+        for msg, parsed in zip(chunk, parsed_all):
+            if app_of.get(msg["id"], msg["id"]) not in failed:
+                store.mark_processed(msg["id"], parsed, engine=engine.name, engine_version=engine.version)
+            else:
+                deferred += 1
+        for msg_id, reason in skipped:
+            store.mark_skipped(msg_id, reason, TRIAGE_VERSION)
+        if apps is not None:
+            apps.save(store)
+        store.commit()
+
+    pc = cfg.app.get("pipeline") or {}
+    if serial or not pc.get("enabled", True):
+        times = run_serial(chunks, fetch, infer, write)
+    else:
+        times = run_staged(chunks, fetch, infer, write, fetch_workers=int(pc.get("fetch_workers", 2)),
+                           queue_size=int(pc.get("queue_size", 2)))
+    if chunks:
+        print(f"[TIMING] {times.summary()}")
+    if chunks and tc.get("enabled", True):
+        kept = metrics.METRICS.count("triage", decision="keep")
+        dropped = metrics.METRICS.count("triage", decision="skip")
+        print(f"[TRIAGE] kept={kept:g} skipped={dropped:g} "
+              f"(~{metrics.METRICS.count('triage_skipped_bytes') / 1024:.0f} KiB of full payloads not downloaded)")
+
+    cs = engine.stats()
+    if cs:
+        print(f"[NLP] status resolved by rules={cs.get('rules', 0)} zero_shot={cs.get('zero_shot', 0)}")
+
+    if result_cache is not None:
+        hits = metrics.METRICS.count("cache_lookups", namespace="results", result="hit")
+        misses = metrics.METRICS.count("cache_lookups", namespace="results", result="miss")
+        print(f"[NLP] result cache hits={hits:g} misses={misses:g} entries={result_cache.stats()['entries']}")
+        result_cache.close()
 
-        processed_ids.add(msg_id)
-
-    state["processed_ids"] = list(processed_ids)
     if msg_refs:
-        state["last_message_id"] = msg_refs[0]["id"]
-    save_state(state)
+        store.set("last_message_id", msg_refs[0]["id"])
+    # only advance the sync point once every new message was fetched and recorded; an incremental
+    # sync would never list the others again, so fetch and calendar failures are retried next run
+    if history_id and fetched_count == len(new_ids) and not deferred:
+        store.set("history_id", history_id)
+        store.set("last_sync", sync_started)
+    store.close()
+    _report_metrics(cfg.app.get("metrics") or {}, messages=len(new_ids), wall_s=round(time.perf_counter() - run_t0, 3))
+    return fetched_count
+
+def _report_metrics(mc, **run_info) -> None:
+    if mc.get("summary", True) and run_info.get("messages"):
+        for line in metrics.METRICS.summary():
+            print(f"[METRICS] {line}")
+    if mc.get("json_path"):
+        metrics.write_json(resolve_path(mc["json_path"]), extra={"run": run_info})
+    if mc.get("prometheus_path"):
+        metrics.write_prometheus(resolve_path(mc["prometheus_path"]))
 
 def main():
     parser = argparse.ArgumentParser(description="Internship Auto Logger (ML)")
     parser.add_argument("--dry-run", action="store_true", help="Do not create Calendar events; print instead")
+    parser.add_argument("--engine", choices=available_engines(), help="Override nlp.engine from config.yaml")
+    parser.add_argument("--serial", action="store_true", help="Fetch, parse and write one chunk at a time (no pipelining)")
+    parser.add_argument("--watch", action="store_true", help="Keep running: poll the mailbox on an adaptive interval with the engine kept loaded")
+    parser.add_argument("--retriage", action="store_true", help="Forget messages skipped by triage so they are scored again")
+    parser.add_argument("--profile", nargs="?", const="data/profile", metavar="DIR",
+                        help="Record cProfile and tracemalloc snapshots of the run into DIR (default data/profile)")
+    sub = parser.add_subparsers(dest="command")
+    bf = sub.add_parser("backfill", help="Parse an mbox / Takeout export or a folder of .eml files into a CSV/Parquet file")
+    bf.add_argument("source", help="mbox file, or a directory searched for .eml and .mbox files")
+    bf.add_argument("--out", required=True, help="Output file; .csv or .parquet (needs pyarrow)")
+    bf.add_argument("--format", choices=["csv", "parquet"], help="Output format when --out has another extension")
+    bf.add_argument("--query", help="Gmail search filter applied locally (default gmail.query from config.yaml)")
+    bf.add_argument("--batch-size", type=int, default=256, help="Messages per engine batch")
+    bf.add_argument("--limit", type=int, help="Stop after this many matching messages")
+    bf.add_argument("--push", action="store_true", help="Upsert the output into the tracker sheet at the end")
     args = parser.parse_args()
-    process_once(dry_run=args.dry_run)
+    if args.command == "backfill":
+        from .backfill import backfill
+        with metrics.profiled(resolve_path(args.profile)) if args.profile else contextlib.nullcontext():
+            backfill(args.source, args.out, load_settings(), fmt=args.format, query=args.query, engine_name=args.engine,
+                     batch_size=args.batch_size, limit=args.limit, push=args.push)
+        return
+    if args.retriage:
+        store = open_state_store(load_settings().app)
+        print(f"[TRIAGE] cleared {store.clear_skipped()} skipped message(s); they are scored again this run")
+        store.set("history_id", None)   # incremental sync would never list them again; do one full scan
+        store.close()
+    run = lambda: process_once(dry_run=args.dry_run, serial=args.serial, engine_name=args.engine)
+    with metrics.profiled(resolve_path(args.profile)) if args.profile else contextlib.nullcontext():
+        if args.watch:
+            from .watch import watch
+            watch(run, load_settings().app.get("watch"))
+        else:
+            run()
 
 if __name__ == "__main__":
     main()
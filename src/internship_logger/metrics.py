@@ -0,0 +1,186 @@
+import cProfile, io, json, os, pstats, re, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (metric name, sorted label pairs)
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Metrics:
+    """Thread-safe counters and timers (count / total / max seconds), keyed by name + labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Key, float] = {}
+        self.timers: Dict[Key, List[float]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, n: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            t = self.timers.setdefault(key, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def count(self, name: str, **labels) -> float:
+        """Sum of counter `name` over every series whose labels include `labels`."""
+        want = set(_key(name, labels)[1])
+        with self._lock:
+            return sum(v for (n, lb), v in self.counters.items() if n == name and want <= set(lb))
+
+    def seconds(self, name: str, **labels) -> float:
+        want = set(_key(name, labels)[1])
+        with self._lock:
+            return sum(t[1] for (n, lb), t in self.timers.items() if n == name and want <= set(lb))
+
+    def merge(self, snap: Dict[str, Any]) -> None:
+        """Adds a snapshot() taken elsewhere (e.g. in a worker process) into this registry."""
+        with self._lock:
+            for c in snap.get("counters", []):
+                key = _key(c["name"], c["labels"])
+                self.counters[key] = self.counters.get(key, 0) + c["value"]
+            for t in snap.get("timers", []):
+                cur = self.timers.setdefault(_key(t["name"], t["labels"]), [0, 0.0, 0.0])
+                cur[0] += t["count"]
+                cur[1] += t["total_s"]
+                cur[2] = max(cur[2], t["max_s"])
+
+    def _after_fork(self) -> None:
+        # another thread may have held the lock at fork time; the child gets a fresh one
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "counters": [{"name": n, "labels": dict(lb), "value": v} for (n, lb), v in sorted(self.counters.items())],
+                "timers": [{"name": n, "labels": dict(lb), "count": int(t[0]), "total_s": round(t[1], 6), "max_s": round(t[2], 6)}
+                           for (n, lb), t in sorted(self.timers.items())],
+            }
+
+    def summary(self) -> List[str]:
+        snap = self.snapshot()
+        lines = [f"{t['name']}{_fmt_labels(t['labels'])} n={t['count']} total={t['total_s']:.3f}s max={t['max_s']:.3f}s"
+                 for t in sorted(snap["timers"], key=lambda t: -t["total_s"])]
+        lines += [f"{c['name']}{_fmt_labels(c['labels'])} {c['value']:g}" for c in snap["counters"]]
+        return lines
+
+    def to_prometheus(self, prefix: str = "ial") -> str:
+        snap = self.snapshot()
+        # metric family -> (type, samples); the exposition format needs each family's samples together
+        families: Dict[str, Tuple[str, List[str]]] = {}
+        def _sample(family: str, kind: str, line: str) -> None:
+            families.setdefault(family, (kind, []))[1].append(line)
+        for c in snap["counters"]:
+            metric = f"{prefix}_{_sanitize(c['name'])}_total"
+            _sample(metric, "counter", f"{metric}{_prom_labels(c['labels'])} {c['value']:g}")
+        for t in snap["timers"]:
+            base = f"{prefix}_{_sanitize(t['name'])}_seconds"
+            labels = _prom_labels(t["labels"])
+            _sample(base, "summary", f"{base}_count{labels} {t['count']}")
+            _sample(base, "summary", f"{base}_sum{labels} {t['total_s']}")
+            _sample(base + "_max", "gauge", f"{base}_max{labels} {t['max_s']}")
+        _sample(f"{prefix}_last_run_timestamp_seconds", "gauge", f"{prefix}_last_run_timestamp_seconds {snap['started']:.0f}")
+        out: List[str] = []
+        for family, (kind, samples) in families.items():
+            out.append(f"# TYPE {family} {kind}")
+            out.extend(samples)
+        return "\n".join(out) + "\n"
+
+def _sanitize(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    return "{" + ",".join(f"{k}={v}" for k, v in labels.items()) + "}" if labels else ""
+
+def _prom_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{_sanitize(k)}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+def _atomic_write(path: str, text: str) -> None:
+    # the node_exporter textfile collector may read at any moment, so never expose a half-written file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+# process-wide registry; process_once resets it so exported numbers describe the last run
+METRICS = Metrics()
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=METRICS._after_fork)
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB; 0.0 where `resource` is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+@contextmanager
+def api_call(api: str, method: str, n: int = 1) -> Iterator[None]:
+    """One HTTP round trip to a Google API carrying `n` logical calls (n > 1 for batches)."""
+    METRICS.inc("google_api_calls", n, api=api, method=method)
+    with METRICS.timer("google_api", api=api, method=method):
+        yield
+
+def write_json(path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+    _atomic_write(path, json.dumps(dict(METRICS.snapshot(), **(extra or {})), indent=2, default=str) + "\n")
+
+def write_prometheus(path: str) -> None:
+    _atomic_write(path, METRICS.to_prometheus())
+
+@contextmanager
+def profiled(out_dir: str, top: int = 30) -> Iterator[None]:
+    """cProfile + tracemalloc around a block; writes run.prof, profile.txt and tracemalloc.txt to `out_dir`."""
+    os.makedirs(out_dir, exist_ok=True)
+    tracemalloc.start(25)
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        snap = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        prof.dump_stats(os.path.join(out_dir, "run.prof"))
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        _atomic_write(os.path.join(out_dir, "profile.txt"), buf.getvalue())
+        snap = snap.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")])
+        lines = [f"current={current / 1e6:.1f}MB peak={peak / 1e6:.1f}MB", ""]
+        lines += [str(stat) for stat in snap.statistics("lineno")[:top]]
+        _atomic_write(os.path.join(out_dir, "tracemalloc.txt"), "\n".join(lines) + "\n")
+        snap.dump(os.path.join(out_dir, "run.tracemalloc"))
+        print(f"[PROFILE] wrote run.prof, profile.txt, tracemalloc.txt to {out_dir} (peak traced {peak / 1e6:.1f}MB)")
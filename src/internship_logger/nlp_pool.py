@@ -0,0 +1,66 @@
+import gc, math, multiprocessing as mp, os, sys
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+
+# env knobs read by BLAS/OpenMP runtimes that initialize lazily inside a worker
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# the loaded engine inside a worker process (set by the initializer, never in the parent)
+_ENGINE = None
+
+def fork_available() -> bool:
+    return "fork" in mp.get_all_start_methods()
+
+def default_threads(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def _init_worker(engine, threads: int) -> None:
+    global _ENGINE
+    for var in THREAD_ENV:
+        os.environ[var] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+    engine._after_fork()
+    _ENGINE = engine
+
+def _parse_chunk(items):
+    # metrics recorded in the worker travel back with the results and are merged by the parent
+    metrics.METRICS.reset()
+    return _ENGINE._parse(items), metrics.METRICS.snapshot()
+
+class WorkerPool:
+    """Forked processes running `engine._parse` on slices of a batch, results in input order.
+
+    The pool is forked after the engine's models are loaded, so workers share the parent's
+    weights copy-on-write instead of loading their own. Each worker is limited to `threads`
+    torch/BLAS threads so N workers don't oversubscribe the cores.
+    """
+
+    def __init__(self, engine, workers: int, threads: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.threads = int(threads or default_threads(self.workers))
+        self.chunk_size = int(chunk_size) if chunk_size else None
+        # fast tokenizers deadlock if their Rust thread pool was used before a fork
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        # keep the collector from touching (and so copying) every inherited object's header
+        gc.collect()
+        gc.freeze()
+        try:
+            self._pool = mp.get_context("fork").Pool(self.workers, initializer=_init_worker, initargs=(engine, self.threads))
+        finally:
+            gc.unfreeze()
+        print(f"[NLP] forked {self.workers} inference worker(s) x {self.threads} thread(s) for engine={engine.name}")
+
+    def parse(self, items: List[Any]) -> List[Dict[str, Any]]:
+        size = self.chunk_size or max(1, math.ceil(len(items) / (self.workers * 2)))
+        out: List[Dict[str, Any]] = []
+        for results, snap in self._pool.imap(_parse_chunk, [items[i:i + size] for i in range(0, len(items), size)]):
+            out.extend(results)
+            metrics.METRICS.merge(snap)
+        return out
+
+    def close(self) -> None:
+        self._pool.terminate()
+        self._pool.join()
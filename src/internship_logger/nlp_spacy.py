@@ -1,32 +1,26 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-import dateparser
-try:
-    from dateparser.search import search_dates
-except Exception:
-    search_dates = None
 
 import spacy
 from spacy.language import Language
+from spacy.tokens import Doc
 from spacy.pipeline import EntityRuler
 
-STATUS_RULES = [
-    ("Rejected", r"(?:\bwe regret\b|\bunfortunately\b|\bnot moving forward\b|\bdeclined\b)"),
-    ("Interview", r"(?:\binterview\b|\bschedule time\b|\bbook a time\b|\bphone screen\b|\bscreening\b)"),
-    ("OA", r"(?:\bonline assessment\b|\bcoding challenge\b|\bhackerrank\b|\bcodility\b|\bassessment\b)"),
-    ("Applied", r"(?:\bapplication confirmation\b|\bapplication received\b|\bthank you for applying\b|\bthank you for your application\b|\bwe(?:\s+have)?\s+received your application\b|\bwe'?ve received your application\b|\bconfirm that your application\b|\bhas been received\b|\bthank you for your interest\b)"),
-]
+from . import metrics
+from .dates import extract_date
+from .rule_engine import RULES
+
+# only tokenization, NER and the ROLE entity ruler are used; the rest is dead weight per doc
+UNUSED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+BODY_CHARS = 4000
+ROLE_BODY_CHARS = 1500
 
 def classify_status(subject: str, body: str) -> str:
-    text = f"{subject}\n{body}".lower()
-    for label, pattern in STATUS_RULES:
-        if re.search(pattern, text):
-            return label
-    return "Other"
+    return RULES.status(RULES.hits(subject, body))[0]
 
 def build_spacy(model_name: str, role_synonyms: List[str]) -> Language:
-    nlp = spacy.load(model_name)
+    nlp = spacy.load(model_name, disable=UNUSED_PIPES)
     ruler = nlp.add_pipe("entity_ruler", before="ner")
     patterns = []
     role_heads = [{"LOWER": {"IN": ["engineering", "engineer", "science", "scientist", "developer"]}, "OP": "?"}]
@@ -39,15 +33,16 @@ def build_spacy(model_name: str, role_synonyms: List[str]) -> Language:
     ruler.add_patterns(patterns)
     return nlp
 
-def extract_company_spacy(nlp: Language, subject: str, from_header: str, body: str) -> str:
-    doc_subj = nlp(subject)
+def _company_from_docs(doc_subj: Doc, doc_body: Optional[Doc], subject: str, from_header: str) -> Optional[str]:
+    """Company from the shared docs; None means the body doc is needed but was not parsed yet."""
     orgs = [ent.text.strip() for ent in doc_subj.ents if ent.label_ == "ORG"]
     if orgs:
         return orgs[0]
     m = re.search(r"\bat\s+([A-Z][A-Za-z0-9&.\- ]{2,})", subject)
     if m:
         return m.group(1).strip(" -—|:")
-    doc_body = nlp(body[:4000])
+    if doc_body is None:
+        return None
     orgs = [ent.text.strip() for ent in doc_body.ents if ent.label_ == "ORG"]
     if orgs:
         return orgs[0]
@@ -61,13 +56,14 @@ def extract_company_spacy(nlp: Language, subject: str, from_header: str, body: s
         return "Netflix"
     return "Unknown"
 
-def extract_role_spacy(nlp: Language, subject: str, body: str) -> str:
-    doc_subj = nlp(subject)
+def _role_from_docs(doc_subj: Doc, doc_body: Optional[Doc], subject: str) -> Optional[str]:
     roles = [ent.text.strip(" -—|:") for ent in doc_subj.ents if ent.label_ == "ROLE"]
     if roles:
         return roles[0]
-    doc_body = nlp(body[:1500])
-    roles = [ent.text.strip(" -—|:") for ent in doc_body.ents if ent.label_ == "ROLE"]
+    if doc_body is None:
+        return None
+    # the body doc covers BODY_CHARS; role hints only count in the first ROLE_BODY_CHARS
+    roles = [ent.text.strip(" -—|:") for ent in doc_body.ents if ent.label_ == "ROLE" and ent.end_char <= ROLE_BODY_CHARS]
     if roles:
         return roles[0]
     m = re.search(r"for the (.*?) position", subject, flags=re.I)
@@ -75,27 +71,49 @@ def extract_role_spacy(nlp: Language, subject: str, body: str) -> str:
         return m.group(1).strip(" -—|:")
     return "Intern"
 
+def extract_company_spacy(nlp: Language, subject: str, from_header: str, body: str) -> str:
+    doc_subj = nlp(subject)
+    company = _company_from_docs(doc_subj, None, subject, from_header)
+    return company if company is not None else _company_from_docs(doc_subj, nlp(body[:BODY_CHARS]), subject, from_header)
+
+def extract_role_spacy(nlp: Language, subject: str, body: str) -> str:
+    doc_subj = nlp(subject)
+    role = _role_from_docs(doc_subj, None, subject)
+    return role if role is not None else _role_from_docs(doc_subj, nlp(body[:BODY_CHARS]), subject)
+
 def extract_date_spacy(subject: str, body: str, fallback: datetime) -> datetime:
-    text = subject + "\n" + body
-    if search_dates:
-        try:
-            found = search_dates(text, settings={"PREFER_DATES_FROM":"past"})
-            if found:
-                for _, dt in found:
-                    if abs((fallback - dt).days) <= 365:
-                        return dt
-        except Exception:
-            pass
-    m = re.search(r"(?:on|dated)\s+([A-Za-z0-9, /\-]+)", text, flags=re.I)
-    if m:
-        parsed = dateparser.parse(m.group(1))
-        if parsed:
-            return parsed
-    return fallback
+    return extract_date(subject, body, fallback)
+
+def parse_emails(nlp: Language, items: List[Tuple[str, str, str, datetime]], batch_size: int = 64, n_process: int = 1) -> List[Dict[str, Any]]:
+    """Parses every subject once, and a body only when the subject alone can't give company and role.
+
+    Both extractors share the same Doc objects; docs are produced with nlp.pipe in batches.
+    """
+    metrics.inc("model_inputs", len(items), model="spacy")
+    with metrics.timer("engine_step", engine="spacy", step="subject_pipe"):
+        subj_docs = list(nlp.pipe([subj for subj, _, _, _ in items], batch_size=batch_size, n_process=n_process))
+    partial = [(_company_from_docs(d, None, subj, frm), _role_from_docs(d, None, subj))
+               for d, (subj, frm, _, _) in zip(subj_docs, items)]
+    need_body = [i for i, (company, role) in enumerate(partial) if company is None or role is None]
+    metrics.inc("model_inputs", len(need_body), model="spacy")
+    with metrics.timer("engine_step", engine="spacy", step="body_pipe"):
+        body_docs: Dict[int, Doc] = dict(zip(need_body, nlp.pipe([items[i][2][:BODY_CHARS] for i in need_body],
+                                                                  batch_size=batch_size, n_process=n_process)))
+    out = []
+    for i, ((subject, from_header, body, fallback_date), (company, role)) in enumerate(zip(items, partial)):
+        if i in body_docs:
+            if company is None:
+                company = _company_from_docs(subj_docs[i], body_docs[i], subject, from_header)
+            if role is None:
+                role = _role_from_docs(subj_docs[i], body_docs[i], subject)
+        hits = RULES.hits(subject, body)
+        out.append({
+            "status": RULES.status(hits)[0],
+            "company": company,
+            "role": role,
+            "date_applied": extract_date(subject, body, fallback_date, RULES.spans(hits, "date")),
+        })
+    return out
 
 def parse_email(nlp: Language, subject: str, from_header: str, body: str, fallback_date: datetime) -> Dict[str, Any]:
-    status = classify_status(subject, body)
-    company = extract_company_spacy(nlp, subject, from_header, body)
-    role = extract_role_spacy(nlp, subject, body)
-    applied = extract_date_spacy(subject, body, fallback_date)
-    return {"status": status, "company": company, "role": role, "date_applied": applied}
+    return parse_emails(nlp, [(subject, from_header, body, fallback_date)])[0]
@@ -1,17 +1,20 @@
 from __future__ import annotations
 import re
-from typing import Dict, Any, List, Tuple
+import weakref
+from array import array
+from typing import Dict, Any, List, Tuple, Callable, Optional
 from datetime import datetime
 
-import dateparser
-try:
-    from dateparser.search import search_dates
-except Exception:
-    search_dates = None
-
-from transformers import pipeline
+import torch
 from sentence_transformers import SentenceTransformer, util
 
+from . import metrics
+from .cache import DiskCache
+from .dates import extract_date as extract_date_shared
+from .nlp_rules import classify_status_scored
+from .settings import resolve_path
+from .xfmr_backends import backend_options, build_pipelines
+
 def _clean(s: str) -> str:
     s = re.sub(r"[\u200B-\u200D\uFEFF]", "", s or "")
     s = re.sub(r"[ \t]+", " ", s)
@@ -24,25 +27,26 @@ _ZS = None
 _NER = None
 _EMB = None
 
-def _ensure_models(zs_name: str, ner_name: str, emb_name: str):
+def _ensure_models(zs_name: str, ner_name: str, emb_name: str, opts: Optional[Dict[str, Any]] = None):
     global _ZS, _NER, _EMB
-    if _ZS is None:
-        _ZS = pipeline("zero-shot-classification", model=zs_name)
-    if _NER is None:
-        _NER = pipeline("ner", model=ner_name, aggregation_strategy="simple")
+    opts = opts or backend_options({})
+    if _ZS is None or _NER is None:
+        _ZS, _NER = build_pipelines(zs_name, ner_name, opts)
     if _EMB is None:
-        _EMB = SentenceTransformer(emb_name)
+        _EMB = SentenceTransformer(emb_name, local_files_only=opts["local_files_only"])
+        if opts.get("max_length"):
+            _EMB.max_seq_length = min(_EMB.max_seq_length or int(opts["max_length"]), int(opts["max_length"]))
     return _ZS, _NER, _EMB
 
-def extract_company(subject: str, from_header: str, body: str, ner_pipe) -> str:
-    sub_ents = ner_pipe(_clean(subject)) or []
-    orgs = [e["word"] for e in sub_ents if e.get("entity_group") == "ORG"]
-    if orgs:
-        return orgs[0]
-    body_ents = ner_pipe(_clean(body[:4000])) or []
-    orgs = [e["word"] for e in body_ents if e.get("entity_group") == "ORG"]
-    if orgs:
-        return orgs[0]
+def unload_models() -> None:
+    global _ZS, _NER, _EMB
+    _ZS = _NER = _EMB = None
+    _PROBES.clear()
+
+def _orgs(ents) -> List[str]:
+    return [e["word"] for e in (ents or []) if e.get("entity_group") == "ORG"]
+
+def _company_fallback(subject: str, from_header: str) -> str:
     m = re.search(r"\bat\s+([A-Z][A-Za-z0-9&.\- ]{2,})", subject)
     if m:
         return m.group(1).strip(" -—|:")
@@ -56,6 +60,15 @@ def extract_company(subject: str, from_header: str, body: str, ner_pipe) -> str:
         return "Netflix"
     return "Unknown"
 
+def extract_company(subject: str, from_header: str, body: str, ner_pipe) -> str:
+    orgs = _orgs(ner_pipe(_clean(subject)))
+    if orgs:
+        return orgs[0]
+    orgs = _orgs(ner_pipe(_clean(body[:4000])))
+    if orgs:
+        return orgs[0]
+    return _company_fallback(subject, from_header)
+
 def _candidate_role_phrases(subject: str, body: str) -> List[str]:
     txt = _texts(subject, body)
     cands = set()
@@ -67,10 +80,7 @@ def _candidate_role_phrases(subject: str, body: str) -> List[str]:
         cands.add(m.group(1).strip(" -—|:").lower())
     return list(cands)[:20] or ["intern"]
 
-def extract_role(subject: str, body: str, emb_model, probe_phrases: List[str]) -> str:
-    cands = _candidate_role_phrases(subject, body)
-    emb_cands = emb_model.encode(cands, convert_to_tensor=True, normalize_embeddings=True)
-    emb_probe = emb_model.encode(probe_phrases, convert_to_tensor=True, normalize_embeddings=True)
+def _pick_role(cands: List[str], emb_cands, emb_probe) -> str:
     sim = util.cos_sim(emb_cands, emb_probe).max(dim=1).values
     best_idx = int(sim.argmax().item())
     best = cands[best_idx]
@@ -78,36 +88,153 @@ def extract_role(subject: str, body: str, emb_model, probe_phrases: List[str]) -
     best = re.sub(r"\bai\b", "AI", best, flags=re.I)
     return best.title()
 
+# probe phrases never change within a run: one normalized matrix per (model, probe set)
+_PROBES: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, ...], Any]]" = weakref.WeakKeyDictionary()
+_EMB_CACHE: Optional[DiskCache] = None
+
+def _probe_matrix(emb_model, probe_phrases: List[str]):
+    per_model = _PROBES.setdefault(emb_model, {})
+    key = tuple(probe_phrases)
+    if key not in per_model:
+        per_model[key] = emb_model.encode(list(probe_phrases), convert_to_tensor=True, normalize_embeddings=True)
+    return per_model[key]
+
+def _embed_cache(cfg_block: Dict[str, Any]) -> Optional[DiskCache]:
+    global _EMB_CACHE
+    cc = cfg_block.get("embed_cache") or {}
+    if not cc.get("enabled", False):
+        return None
+    if _EMB_CACHE is None:
+        _EMB_CACHE = DiskCache(resolve_path(cc.get("path", "data/embed_cache.sqlite")), namespace="embeddings",
+                               max_entries=int(cc.get("max_entries", 50000)))
+    return _EMB_CACHE
+
+def _norm_phrase(s: str) -> str:
+    return re.sub(r"\s+", " ", s.strip().lower())
+
+def _encode_phrases(emb_model, emb_name: str, phrases: List[str], bs: int, cache: Optional[DiskCache]):
+    """Normalized embeddings for `phrases` (in order), reading and filling the disk cache when given."""
+    if cache is None:
+        metrics.inc("model_inputs", len(phrases), model="embed")
+        with metrics.timer("model_forward", model="embed"):
+            return emb_model.encode(phrases, batch_size=bs, convert_to_tensor=True, normalize_embeddings=True)
+    keys = [f"{emb_name}\x00{_norm_phrase(p)}" for p in phrases]
+    found = cache.get_many(keys)
+    missing = [i for i, k in enumerate(keys) if k not in found]
+    rows: Dict[str, Any] = {k: torch.tensor(array("f", v)) for k, v in found.items()}
+    if missing:
+        metrics.inc("model_inputs", len(missing), model="embed")
+        with metrics.timer("model_forward", model="embed"):
+            fresh = emb_model.encode([phrases[i] for i in missing], batch_size=bs, convert_to_tensor=True, normalize_embeddings=True)
+        new_items = {}
+        for i, vec in zip(missing, fresh):
+            vec = vec.detach().float().cpu()
+            rows[keys[i]] = vec
+            new_items[keys[i]] = array("f", vec.tolist()).tobytes()
+        cache.put_many(new_items)
+    return torch.stack([rows[k] for k in keys])
+
+def extract_role(subject: str, body: str, emb_model, probe_phrases: List[str]) -> str:
+    cands = _candidate_role_phrases(subject, body)
+    emb_cands = emb_model.encode(cands, convert_to_tensor=True, normalize_embeddings=True)
+    emb_probe = _probe_matrix(emb_model, probe_phrases)
+    return _pick_role(cands, emb_cands, emb_probe)
+
 def extract_date(subject: str, body: str, fallback: datetime) -> datetime:
-    text = _texts(subject, body)
-    if search_dates:
-        try:
-            found = search_dates(text, settings={"PREFER_DATES_FROM":"past"})
-            if found:
-                for _, dt in found:
-                    if abs((fallback - dt).days) <= 365:
-                        return dt
-        except Exception:
-            pass
-    m = re.search(r"(?:on|dated)\s+([A-Za-z0-9, /\-]+)", text, flags=re.I)
-    if m:
-        parsed = dateparser.parse(m.group(1))
-        if parsed:
-            return parsed
-    return fallback
-
-def parse_email_transformer(cfg_block: Dict[str, Any], subject: str, from_header: str, body: str, fallback_date: datetime) -> Dict[str, Any]:
-    zs_name = cfg_block.get("zero_shot_model", "facebook/bart-large-mnli")
-    ner_name = cfg_block.get("ner_model", "dslim/bert-base-NER")
-    emb_name = cfg_block.get("embed_model", "sentence-transformers/all-MiniLM-L6-v2")
+    return extract_date_shared(_clean(subject), _clean(body), fallback)
+
+def _bucketed(texts: List[str], batch_size: int, run: Callable[[List[str]], List[Any]]) -> List[Any]:
+    # sort by length so each batch pads to a similar size, then restore input order
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    out: List[Any] = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        res = run([texts[i] for i in idx])
+        if isinstance(res, dict):
+            res = [res]
+        for i, r in zip(idx, res):
+            out[i] = r
+    return out
+
+def _forward(model: str, run: Callable[[List[str]], Any]) -> Callable[[List[str]], Any]:
+    # one call = one batched forward pass; counts inputs and times the pass per model
+    def _run(chunk: List[str]):
+        metrics.inc("model_inputs", len(chunk), model=model)
+        with metrics.timer("model_forward", model=model):
+            return run(chunk)
+    return _run
+
+def _model_names(cfg_block: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        cfg_block.get("zero_shot_model", "facebook/bart-large-mnli"),
+        cfg_block.get("ner_model", "dslim/bert-base-NER"),
+        cfg_block.get("embed_model", "sentence-transformers/all-MiniLM-L6-v2"),
+    )
+
+def _classify_statuses(ZS, items, labels: List[str], bs: int, cascade: Optional[Dict[str, Any]]) -> List[str]:
+    statuses: List[Optional[str]] = [None] * len(items)
+    if cascade and cascade.get("enabled", False):
+        min_conf = float(cascade.get("min_confidence", 0.8))
+        for i, (subj, _, body, _) in enumerate(items):
+            label, conf = classify_status_scored(subj, body)
+            if conf >= min_conf and label in labels:
+                statuses[i] = label
+                metrics.inc("cascade_resolved", tier="rules")
+    pending = [i for i, st in enumerate(statuses) if st is None]
+    if pending:
+        zs_out = _bucketed([_texts(items[i][0], items[i][2]) for i in pending], bs,
+                           _forward("zero_shot", lambda chunk: ZS(chunk, labels, multi_label=False, batch_size=len(chunk))))
+        for i, r in zip(pending, zs_out):
+            statuses[i] = r["labels"][0]
+        metrics.inc("cascade_resolved", len(pending), tier="zero_shot")
+    return statuses
+
+def parse_emails_transformer(cfg_block: Dict[str, Any], items: List[Tuple[str, str, str, datetime]],
+                             cascade: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Batched version of parse_email_transformer; `items` are (subject, from_header, body, fallback_date).
+
+    With `cascade` enabled, emails the rule classifier labels confidently skip zero-shot.
+    """
+    if not items:
+        return []
     labels = cfg_block.get("status_labels", ["Applied","Interview","OA","Rejected","Offer","Other"])
     probes = cfg_block.get("role_probe_phrases", ["software engineering intern","data science intern","machine learning intern","research intern","security intern"])
+    bs = max(1, int(cfg_block.get("batch_size", 16)))
+
+    zs_name, ner_name, emb_name = _model_names(cfg_block)
+    ZS, NER, EMB = _ensure_models(zs_name, ner_name, emb_name, backend_options(cfg_block))
+
+    with metrics.timer("engine_step", engine="transformer", step="status"):
+        statuses = _classify_statuses(ZS, items, labels, bs, cascade)
+
+    # company: NER on all subjects, then on bodies only where the subject had no ORG
+    ner = _forward("ner", lambda chunk: NER(chunk, batch_size=len(chunk)))
+    with metrics.timer("engine_step", engine="transformer", step="company"):
+        sub_ents = _bucketed([_clean(subj) for subj, _, _, _ in items], bs, ner)
+        companies: List[Any] = [(_orgs(e) or [None])[0] for e in sub_ents]
+        need_body = [i for i, c in enumerate(companies) if c is None]
+        if need_body:
+            body_ents = _bucketed([_clean(items[i][2][:4000]) for i in need_body], bs, ner)
+            for i, ents in zip(need_body, body_ents):
+                orgs = _orgs(ents)
+                companies[i] = orgs[0] if orgs else _company_fallback(items[i][0], items[i][1])
 
-    ZS, NER, EMB = _ensure_models(zs_name, ner_name, emb_name)
+    # role: embed each distinct candidate phrase once across the whole batch
+    with metrics.timer("engine_step", engine="transformer", step="role"):
+        cands = [_candidate_role_phrases(subj, body) for subj, _, body, _ in items]
+        uniq = list(dict.fromkeys(c for cs in cands for c in cs))
+        emb_all = _encode_phrases(EMB, emb_name, uniq, bs, _embed_cache(cfg_block))
+        emb_probe = _probe_matrix(EMB, probes)
+        if emb_all.device != emb_probe.device:
+            emb_all = emb_all.to(emb_probe.device)
+        pos = {c: i for i, c in enumerate(uniq)}
+        roles = [_pick_role(cs, emb_all[[pos[c] for c in cs]], emb_probe) for cs in cands]
 
-    status = ZS(_texts(subject, body), labels, multi_label=False)["labels"][0]
-    company = extract_company(subject, from_header, body, NER)
-    role = extract_role(subject, body, EMB, probes)
-    applied = extract_date(subject, body, fallback_date)
+    with metrics.timer("engine_step", engine="transformer", step="date"):
+        dates = [extract_date(subj, body, fallback) for subj, _, body, fallback in items]
+    return [{"status": status, "company": company, "role": role, "date_applied": applied}
+            for status, company, role, applied in zip(statuses, companies, roles, dates)]
 
-    return {"status": status, "company": company, "role": role, "date_applied": applied}
+def parse_email_transformer(cfg_block: Dict[str, Any], subject: str, from_header: str, body: str, fallback_date: datetime,
+                            cascade: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return parse_emails_transformer(cfg_block, [(subject, from_header, body, fallback_date)], cascade=cascade)[0]
@@ -0,0 +1,126 @@
+import queue, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+
+from . import metrics
+
+_DONE = object()
+
+class StageTimes:
+    """Busy seconds and item counts per stage (fetch time is summed over its workers)."""
+
+    def __init__(self, *stages: str):
+        self._lock = threading.Lock()
+        self.busy: Dict[str, float] = {s: 0.0 for s in stages}
+        self.items: Dict[str, int] = {s: 0 for s in stages}
+        self.wall = 0.0
+
+    def run(self, stage: str, fn: Callable, arg: Any) -> Any:
+        t0 = time.perf_counter()
+        out = fn(arg)
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.busy[stage] += dt
+            self.items[stage] += 1
+        metrics.observe("stage", dt, stage=stage)
+        return out
+
+    def summary(self) -> str:
+        parts = [f"{s}={self.busy[s]:.2f}s/{self.items[s]}" for s in self.busy]
+        return f"wall={self.wall:.2f}s " + " ".join(parts)
+
+def run_serial(chunks: Iterable[List[str]], fetch: Callable, infer: Callable, write: Callable) -> StageTimes:
+    times = StageTimes("fetch", "infer", "write")
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        fetched = times.run("fetch", fetch, chunk)
+        parsed = times.run("infer", infer, fetched)
+        times.run("write", write, parsed)
+    times.wall = time.perf_counter() - t0
+    return times
+
+def run_staged(chunks: Iterable[List[str]], fetch: Callable, infer: Callable, write: Callable,
+               fetch_workers: int = 2, queue_size: int = 2) -> StageTimes:
+    """fetch -> infer -> write over micro-batches, each stage on its own thread(s).
+
+    Stages are joined by bounded queues, so a slow writer throttles inference and fetching.
+    Chunks reach every stage in input order; `write` runs on the calling thread, so state
+    commits happen in the same order as a serial run.
+    """
+    times = StageTimes("fetch", "infer", "write")
+    fetched_q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+    parsed_q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def _put(q, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return _DONE
+
+    def fetch_stage():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as pool:
+                pending: deque = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(times.run, "fetch", fetch, chunk))
+                    # keep at most fetch_workers chunks in flight and hand them on in order
+                    if len(pending) >= max(1, fetch_workers) and not _put(fetched_q, pending.popleft().result()):
+                        return
+                while pending:
+                    if not _put(fetched_q, pending.popleft().result()):
+                        return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(fetched_q, _DONE)
+
+    def infer_stage():
+        try:
+            while True:
+                item = _get(fetched_q)
+                if item is _DONE:
+                    break
+                if not _put(parsed_q, times.run("infer", infer, item)):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(parsed_q, _DONE)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=fetch_stage, name="ial-fetch", daemon=True),
+               threading.Thread(target=infer_stage, name="ial-infer", daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            item = _get(parsed_q)
+            if item is _DONE:
+                break
+            times.run("write", write, item)
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        times.wall = time.perf_counter() - t0
+    if errors:
+        raise errors[0]
+    return times
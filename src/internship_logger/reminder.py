@@ -1,43 +1,80 @@
 from datetime import datetime, timedelta
-from typing import Optional
-import os
-
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-
-CREDENTIALS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "credentials")
-CLIENT_SECRET_FILE = os.path.join(CREDENTIALS_DIR, "client_secret.json")
-TOKEN_FILE = os.path.join(CREDENTIALS_DIR, "token.json")
-
-SCOPES_CAL = ["https://www.googleapis.com/auth/calendar.events"]
-
-def _ensure_cal_creds():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES_CAL)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES_CAL)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "w", encoding="utf-8") as token:
-            token.write(creds.to_json())
-    return creds
+from typing import Optional, List, Dict, Any
+import base64
 
-def create_followup_event(calendar_id: str, company: str, role: str, followup_dt: datetime, email_id: str, dry_run: bool = False) -> Optional[str]:
-    if dry_run:
-        print(f"[DRY-RUN] Would create calendar event on {followup_dt} for {company} — {role}")
-        return None
-    creds = _ensure_cal_creds()
-    service = build("calendar", "v3", credentials=creds)
-    event = {
+from googleapiclient.errors import HttpError
+
+from . import metrics
+from .google_session import get_session
+
+# calendar batch requests are limited to 50 calls
+BATCH_SIZE = 50
+
+def get_calendar_service():
+    return get_session().service("calendar", "v3")
+
+def followup_event_id(email_id: str) -> str:
+    # event ids must be 5-1024 chars of base32hex (a-v, 0-9); deriving it from the
+    # Gmail id makes re-inserting the same follow-up a conflict instead of a duplicate
+    return "ial" + base64.b32hexencode(email_id.encode("utf-8")).decode("ascii").lower().rstrip("=")
+
+def _event_body(company: str, role: str, followup_dt: datetime, email_id: str) -> Dict[str, Any]:
+    return {
+        "id": followup_event_id(email_id),
         "summary": f"Follow up: {company} — {role}",
         "description": f"Auto-created by Internship Logger\nEmailId: {email_id}",
         "start": {"date": followup_dt.date().isoformat()},
         "end": {"date": (followup_dt.date() + timedelta(days=1)).isoformat()},
     }
-    created = service.events().insert(calendarId=calendar_id, body=event).execute()
-    return created.get("id")
+
+def _run_batch(service, calls, http, method: str) -> Dict[str, Any]:
+    """Executes (request_id, request) pairs in batches; returns request_id -> response or HttpError."""
+    out: Dict[str, Any] = {}
+    def _cb(request_id, response, exception):
+        out[request_id] = exception if exception is not None else response
+    for start in range(0, len(calls), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_cb)
+        for request_id, request in calls[start:start + BATCH_SIZE]:
+            batch.add(request, request_id=request_id)
+        with metrics.api_call("calendar", method, n=len(calls[start:start + BATCH_SIZE])):
+            batch.execute(http=http)
+    return out
+
+def create_followup_events(calendar_id: str, items: List[Dict[str, Any]], dry_run: bool = False,
+                           service=None, http=None) -> List[Dict[str, Any]]:
+    """Creates follow-ups for `items` (dicts with company, role, followup_dt, email_id).
+
+    Returns one {"email_id", "event_id", "status"} dict per item, where status is
+    created, updated, dry_run or error. Events already present are updated in place.
+    """
+    results = [{"email_id": it["email_id"], "event_id": followup_event_id(it["email_id"]), "status": "dry_run"} for it in items]
+    if dry_run:
+        for it in items:
+            print(f"[DRY-RUN] Would create calendar event on {it['followup_dt']} for {it['company']} — {it['role']}")
+        return results
+    if not items:
+        return results
+    service = service or get_calendar_service()
+    bodies = {r["event_id"]: _event_body(it["company"], it["role"], it["followup_dt"], it["email_id"]) for it, r in zip(items, results)}
+
+    inserted = _run_batch(service, [(eid, service.events().insert(calendarId=calendar_id, body=b)) for eid, b in bodies.items()], http, "events.insert")
+    conflicts = [eid for eid, res in inserted.items() if isinstance(res, HttpError) and res.resp.status == 409]
+    updated = _run_batch(service, [
+        (eid, service.events().update(calendarId=calendar_id, eventId=eid, body=bodies[eid])) for eid in conflicts
+    ], http, "events.update") if conflicts else {}
+
+    for r in results:
+        eid = r["event_id"]
+        res = updated.get(eid, inserted.get(eid))
+        if isinstance(res, HttpError):
+            r["status"] = "error"
+            r["error"] = str(res)
+            print(f"[Calendar] HttpError for {r['email_id']}: {res}")
+        else:
+            r["status"] = "updated" if eid in updated else "created"
+    return results
+
+def create_followup_event(calendar_id: str, company: str, role: str, followup_dt: datetime, email_id: str, dry_run: bool = False) -> Optional[str]:
+    item = {"company": company, "role": role, "followup_dt": followup_dt, "email_id": email_id}
+    res = create_followup_events(calendar_id, [item], dry_run=dry_run)[0]
+    return res["event_id"] if res["status"] in ("created", "updated") else None
@@ -0,0 +1,69 @@
+import hashlib, json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import DiskCache
+from .settings import resolve_path
+
+def config_fingerprint(*blocks: Any) -> str:
+    """Stable short hash of whatever config can change an engine's output."""
+    raw = json.dumps(blocks, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class ResultCache:
+    """Content-addressed {status, company, role, date_applied} results, shared across runs and engines.
+
+    Keys hash the cleaned subject/from/body, the fallback date, the engine name and a fingerprint
+    of its code version, models and config, so upgrading, switching engines or tweaking config
+    never returns stale output.
+    """
+
+    def __init__(self, path: str, engine: str, fingerprint: str, max_entries: int = 20000):
+        self.engine = engine
+        self.fingerprint = fingerprint
+        self._cache = DiskCache(path, namespace="results", max_entries=max_entries)
+
+    def key(self, subject: str, from_header: str, body: str, fallback_date: datetime) -> str:
+        raw = json.dumps([self.engine, self.fingerprint, subject, from_header, body, fallback_date.isoformat()])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for k, blob in self._cache.get_many(keys).items():
+            parsed = json.loads(blob)
+            parsed["date_applied"] = datetime.fromisoformat(parsed["date_applied"])
+            out[k] = parsed
+        return out
+
+    def put_many(self, results: Dict[str, Dict[str, Any]]) -> None:
+        self._cache.put_many({
+            k: json.dumps({**r, "date_applied": r["date_applied"].isoformat()}).encode("utf-8") for k, r in results.items()
+        })
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+    def close(self) -> None:
+        self._cache.close()
+
+def parse_cached(cache: Optional[ResultCache], parse, items: List[Tuple[str, str, str, datetime]]) -> List[Dict[str, Any]]:
+    """Runs `parse(items)` only for items the cache has not seen, keeping input order."""
+    if cache is None:
+        return parse(items)
+    keys = [cache.key(*item) for item in items]
+    hits = cache.get_many(keys)
+    todo = [i for i, k in enumerate(keys) if k not in hits]
+    fresh = parse([items[i] for i in todo]) if todo else []
+    cache.put_many({keys[i]: r for i, r in zip(todo, fresh)})
+    results = dict(hits)
+    results.update({keys[i]: r for i, r in zip(todo, fresh)})
+    return [dict(results[k]) for k in keys]
+
+def open_result_cache(nlp_cfg: Dict[str, Any], engine: str, engine_version: str, engine_cfg: Any,
+                      code_version: str = "") -> Optional[ResultCache]:
+    rc = (nlp_cfg or {}).get("result_cache") or {}
+    if not rc.get("enabled", False):
+        return None
+    fingerprint = config_fingerprint(code_version, engine_version, engine_cfg, (nlp_cfg or {}).get("cascade"))
+    return ResultCache(resolve_path(rc.get("path", "data/results.sqlite")), engine, fingerprint,
+                       max_entries=int(rc.get("max_entries", 20000)))
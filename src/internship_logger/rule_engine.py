@@ -0,0 +1,140 @@
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .dates import DATE_SPAN
+
+# status phrases in priority order: when an email matches several labels the first one wins
+# (a rejection that mentions the interview is a rejection). Phrases are literal, lowercase;
+# a space matches any run of whitespace.
+STATUS_RULES: List[Tuple[str, List[str]]] = [
+    ("Rejected", ["we regret", "unfortunately", "not moving forward", "declined"]),
+    ("Interview", ["interview", "schedule time", "book a time", "phone screen", "screening"]),
+    ("OA", ["online assessment", "coding challenge", "hackerrank", "codility", "assessment"]),
+    ("Applied", ["application confirmation", "application received", "thank you for applying",
+                 "thank you for your application", "we received your application", "we have received your application",
+                 "we've received your application", "weve received your application", "confirm that your application",
+                 "has been received", "thank you for your interest"]),
+]
+
+ROLE_HINT = r"(?:software|swe|data|machine\s*learning|ml|ai|computer|backend|frontend)[^.\n]{0,40}\b(?:intern|internship)\b"
+
+# span patterns (lowercase; matched against the lowercased email); the value is the `v` group
+# when there is one. Company patterns and the "for the X position" role only count in the subject.
+SPAN_RULES: List[Tuple[str, str]] = [
+    ("role", ROLE_HINT),
+    ("company_at", r"at\s+(?P<company_at_v>[a-z0-9&.\- ]{2,})"),
+    ("company_application", r"application (?:to|for)\s+(?P<company_application_v>[a-z0-9&.\- ]{2,})"),
+    ("role_position", r"for the (?P<role_position_v>.*?) position"),
+    ("date", DATE_SPAN.pattern),    # candidate spans for dates.extract_date
+]
+SUBJECT_ONLY = {"company_at", "company_application", "role_position"}
+# spans whose leading word must match case-sensitively ("at Acme", not a title-cased "At")
+EXACT_PREFIX = {"company_at": "at"}
+
+class Hit(NamedTuple):
+    kind: str       # "status" or a SPAN_RULES name
+    label: str      # status label, or the captured text for spans
+    start: int      # offsets into f"{subject}\n{body}"
+    end: int
+    in_subject: bool
+
+def _trie_pattern(phrases: List[str]) -> str:
+    """One alternation with shared prefixes factored out ("thank you for (?:applying|your ...)"),
+    so the regex engine follows one branch per character instead of trying every phrase."""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    def emit(node: Dict[str, Any]) -> str:
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return emit(trie)
+
+class RuleEngine:
+    """Every status phrase and role/company pattern in one alternation with named groups, run in
+    a single pass over a lowercased copy of the subject and of the body. Every branch is a
+    zero-width lookahead, so no match swallows another rule's start inside it ("thank you for
+    your application to acme" yields both the status and the company); status phrases share one
+    prefix-factored branch, map back to their label by phrase and skip phrases nested in the
+    previous one ("assessment" inside "online assessment")."""
+
+    def __init__(self, status_rules=STATUS_RULES, span_rules=SPAN_RULES):
+        self.labels = [label for label, _ in status_rules]
+        self._phrase_label = {p: label for label, phrases in reversed(status_rules) for p in phrases}
+        self._values = {name: f"{name}_v" for name, pattern in span_rules if f"(?P<{name}_v>" in pattern}
+        status = f"(?=(?P<status>{_trie_pattern(list(self._phrase_label))}))"
+        def build(spans):
+            return re.compile(r"\b(?:" + "|".join([f"(?=(?P<{name}>{pattern}))" for name, pattern in spans] + [status]) + ")")
+        # the subject gets every rule; the (much longer) body skips the subject-only spans
+        self._rx_subject = build(span_rules)
+        self._rx_body = build([(name, pattern) for name, pattern in span_rules if name not in SUBJECT_ONLY])
+
+    def _scan(self, rx, text: str, offset: int, in_subject: bool, out: List[Hit]) -> None:
+        low = text.lower()
+        if len(low) != len(text):
+            # a few characters change length when lowercased; offsets must line up with `text`
+            low = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+        status_end = 0
+        for m in rx.finditer(low):
+            name = m.lastgroup
+            if name == "status":
+                start, end = m.span("status")
+                if start >= status_end:
+                    phrase = " ".join(m.group("status").split())
+                    out.append(Hit("status", self._phrase_label[phrase], offset + start, offset + end, in_subject))
+                    status_end = end
+                continue
+            start, end = m.span(name)
+            if name in EXACT_PREFIX and not text.startswith(EXACT_PREFIX[name], start):
+                continue
+            vs, ve = m.span(self._values[name]) if name in self._values else (start, end)
+            out.append(Hit(name, text[vs:ve], offset + start, offset + end, in_subject))
+
+    def hits(self, subject: str, body: str) -> List[Hit]:
+        """Every rule match in the subject, then the body, in order of position."""
+        out: List[Hit] = []
+        self._scan(self._rx_subject, subject, 0, True, out)
+        self._scan(self._rx_body, body, len(subject) + 1, False, out)
+        return out
+
+    def status(self, hits: List[Hit]) -> Tuple[str, float]:
+        """Highest-priority label plus a rough confidence: one unambiguous label scores high,
+        competing labels (e.g. a confirmation that also mentions an assessment) score low."""
+        found = [h for h in hits if h.kind == "status"]
+        if not found:
+            return "Other", 0.0
+        labels = {h.label for h in found}
+        label = min(labels, key=self.labels.index)
+        if len(labels) > 1:
+            return label, 0.5
+        return label, 0.9 if (len(found) > 1 or any(h.in_subject for h in found)) else 0.8
+
+    @staticmethod
+    def first(hits: List[Hit], kind: str) -> Optional[str]:
+        for h in hits:
+            if h.kind == kind:
+                return h.label.strip(" -—|:")
+        return None
+
+    @staticmethod
+    def spans(hits: List[Hit], kind: str) -> List[str]:
+        return [h.label for h in hits if h.kind == kind]
+
+    def analyze(self, subject: str, from_header: str, body: str) -> Dict[str, Any]:
+        """Status (with confidence), company, role and date spans from a single scan."""
+        hits = self.hits(subject, body)
+        status, confidence = self.status(hits)
+        company = self.first(hits, "company_at") or self.first(hits, "company_application")
+        if not company:
+            m = re.match(r"(.*?)(?:<|$)", from_header or "")
+            company = (m.group(1).strip().strip('"') if m else "") or "Unknown"
+        role = self.first(hits, "role") or self.first(hits, "role_position") or "Intern"
+        return {"status": status, "confidence": confidence, "company": company, "role": role,
+                "date_spans": self.spans(hits, "date")}
+
+RULES = RuleEngine()
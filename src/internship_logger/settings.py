@@ -1,8 +1,10 @@
-import os, json, yaml
+import os, yaml
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 
+ROOT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
+
 CONFIG_PATH = os.environ.get(
     "IAL_CONFIG",
     os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "config.yaml")
@@ -33,13 +35,6 @@ def load_settings() -> Settings:
     cfg.setdefault("nlp_spacy", {})
     return Settings(**cfg)
 
-def load_state() -> dict:
-    if not os.path.exists(STATE_PATH):
-        return {"last_message_id": None, "processed_ids": []}
-    with open(STATE_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_state(state: dict) -> None:
-    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+def resolve_path(path: str) -> str:
+    # relative paths in config.yaml are relative to the repo root, like data/ and credentials/
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
@@ -1,30 +1,32 @@
-import os
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List
 import gspread
 
+from . import metrics
+from .google_session import get_session
+
 HEADERS = ["Timestamp","Company","Role","Date Applied","Status","Source","EmailId","ThreadId","FollowUp Due","Notes"]
+EMAIL_ID_COL = HEADERS.index("EmailId") + 1
+LAST_COL = chr(ord("A") + len(HEADERS) - 1)
 
 def _get_client():
-    sa_path = os.getenv("GSPREAD_SERVICE_ACCOUNT_JSON", "").strip()
-    if sa_path:
-        return gspread.service_account(filename=sa_path)
-    return gspread.oauth(
-        credentials_filename=os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "credentials", "client_secret.json"),
-        authorized_user_filename=os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "credentials", "token.json"),
-    )
+    return get_session().gspread_client()
 
 def ensure_sheet(spreadsheet_name: str, worksheet_name: str):
     gc = _get_client()
     try:
-        sh = gc.open(spreadsheet_name)
+        with metrics.api_call("sheets", "open"):
+            sh = gc.open(spreadsheet_name)
     except gspread.SpreadsheetNotFound:
         sh = gc.create(spreadsheet_name)
     try:
-        ws = sh.worksheet(worksheet_name)
+        with metrics.api_call("sheets", "worksheet"):
+            ws = sh.worksheet(worksheet_name)
     except gspread.WorksheetNotFound:
         ws = sh.add_worksheet(title=worksheet_name, rows=1000, cols=len(HEADERS))
         ws.append_row(HEADERS)
-    first_row = ws.row_values(1)
+    with metrics.api_call("sheets", "row_values"):
+        first_row = ws.row_values(1)
     if first_row != HEADERS:
         if not first_row:
             ws.append_row(HEADERS)
@@ -34,10 +36,76 @@ def ensure_sheet(spreadsheet_name: str, worksheet_name: str):
     return ws
 
 def upsert_row(ws, row: Dict[str, Any]) -> None:
-    cells = ws.findall(row.get("EmailId","")) if row.get("EmailId") else []
+    cells = []
+    if row.get("EmailId"):
+        with metrics.api_call("sheets", "findall"):
+            cells = ws.findall(row.get("EmailId",""))
     if cells:
         r = cells[0].row
         ordered = [row.get(h, "") for h in HEADERS]
-        ws.update(f"A{r}:J{r}", [ordered])
+        with metrics.api_call("sheets", "update"):
+            ws.update(f"A{r}:J{r}", [ordered])
     else:
-        ws.append_row([row.get(h, "") for h in HEADERS])
+        with metrics.api_call("sheets", "append_row"):
+            ws.append_row([row.get(h, "") for h in HEADERS])
+
+class SheetBatchWriter:
+    """Buffers upserts keyed by EmailId and writes them with one batch_update plus one append_rows.
+
+    The EmailId column is read once up front, so lookups never hit the API.
+    """
+
+    def __init__(self, ws, flush_every: int = 200):
+        self.ws = ws
+        self.flush_every = max(1, flush_every)
+        self._index: Dict[str, int] = {}
+        self._updates: Dict[int, List[Any]] = {}
+        self._appends: List[List[Any]] = []
+        self._append_pos: Dict[str, int] = {}
+        with metrics.api_call("sheets", "col_values"):
+            column = ws.col_values(EMAIL_ID_COL)
+        for r, value in enumerate(column, start=1):
+            if r > 1 and value:
+                self._index.setdefault(value, r)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        ordered = [row.get(h, "") for h in HEADERS]
+        email_id = row.get("EmailId") or ""
+        r = self._index.get(email_id) if email_id else None
+        if r:
+            self._updates[r] = ordered
+        elif email_id in self._append_pos:
+            self._appends[self._append_pos[email_id]] = ordered
+        else:
+            if email_id:
+                self._append_pos[email_id] = len(self._appends)
+            self._appends.append(ordered)
+        if len(self._updates) + len(self._appends) >= self.flush_every:
+            self.flush()
+
+    def row_of(self, email_id: str):
+        return self._index.get(email_id)
+
+    def flush(self) -> None:
+        if self._updates:
+            with metrics.api_call("sheets", "batch_update", n=len(self._updates)):
+                self.ws.batch_update([
+                    {"range": f"A{r}:{LAST_COL}{r}", "values": [vals]} for r, vals in sorted(self._updates.items())
+                ])
+            self._updates.clear()
+        if self._appends:
+            with metrics.api_call("sheets", "append_rows", n=len(self._appends)):
+                resp = self.ws.append_rows(self._appends)
+            # remember where the new rows landed so later upserts in this run become updates
+            m = re.search(r"![A-Z]+(\d+)", ((resp or {}).get("updates") or {}).get("updatedRange", ""))
+            if m:
+                for email_id, pos in self._append_pos.items():
+                    self._index[email_id] = int(m.group(1)) + pos
+            self._appends.clear()
+            self._append_pos.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -0,0 +1,200 @@
+import os, json, sqlite3, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from .settings import STATE_PATH, resolve_path
+
+# keys that live next to processed ids in the legacy state.json
+_KV_KEYS = ("last_message_id", "history_id", "last_sync")
+# kv flag set in the same transaction as the state.json import (or once there was nothing to import)
+_MIGRATED_KEY = "legacy_migrated"
+# `engine` of processed rows that triage skipped without fetching the body
+SKIPPED_ENGINE = "triage"
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class JsonStateStore:
+    """The original state.json layout: rewritten in full on every commit, ids only."""
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._state = _read_json(path)
+        self._ids = set(self._state.get("processed_ids", []))
+
+    def is_processed(self, msg_id: str) -> bool:
+        return msg_id in self._ids
+
+    def unprocessed(self, ids: Iterable[str]) -> List[str]:
+        return [i for i in ids if i not in self._ids]
+
+    def mark_processed(self, msg_id: str, result: Optional[Dict[str, Any]] = None, engine: str = "", engine_version: str = "") -> None:
+        self._ids.add(msg_id)
+
+    def unmark(self, msg_id: str) -> None:
+        self._ids.discard(msg_id)
+
+    def mark_skipped(self, msg_id: str, reason: str, version: str = "") -> None:
+        self._ids.add(msg_id)
+        self._state.setdefault("skipped", {})[msg_id] = reason
+
+    def clear_skipped(self) -> int:
+        skipped = self._state.pop("skipped", {})
+        self._ids.difference_update(skipped)
+        return len(skipped)
+
+    def applications(self) -> List[Dict[str, Any]]:
+        return list(self._state.get("applications", {}).values())
+
+    def save_applications(self, records: Iterable[Dict[str, Any]]) -> None:
+        apps = self._state.setdefault("applications", {})
+        for rec in records:
+            apps[rec["id"]] = rec
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._state.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self._state[key] = value
+
+    def commit(self) -> None:
+        self._state["processed_ids"] = sorted(self._ids)
+        _write_json(self.path, self._state)
+
+    def close(self) -> None:
+        self.commit()
+
+class SqliteStateStore:
+    """Processed messages and sync bookmarks in SQLite (WAL), one row per message."""
+
+    def __init__(self, path: str, legacy_json: Optional[str] = STATE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " msg_id TEXT PRIMARY KEY, processed_at TEXT, engine TEXT, engine_version TEXT, result TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS applications (app_id TEXT PRIMARY KEY, updated_at TEXT, record TEXT)")
+        self._db.commit()
+        # gated on the kv flag, not on the file being new: a crash between creating the database
+        # and committing the import must not leave the legacy ids behind for good
+        if self.get(_MIGRATED_KEY) is None:
+            if legacy_json and os.path.exists(legacy_json):
+                self._migrate(legacy_json)
+            else:
+                self.set(_MIGRATED_KEY, True)
+                self.commit()
+
+    def _migrate(self, legacy_json: str) -> None:
+        state = _read_json(legacy_json)
+        ids = state.get("processed_ids", [])
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO processed (msg_id, processed_at, engine) VALUES (?, ?, ?)",
+                [(i, _now(), "legacy") for i in ids],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)",
+                [(k, json.dumps(state.get(k))) for k in _KV_KEYS if state.get(k) is not None] + [(_MIGRATED_KEY, "true")],
+            )
+            self._db.commit()
+        os.replace(legacy_json, legacy_json + ".migrated")
+        print(f"[State] migrated {len(ids)} processed id(s) from {legacy_json}")
+
+    def is_processed(self, msg_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM processed WHERE msg_id = ?", (msg_id,)).fetchone() is not None
+
+    def unprocessed(self, ids: Iterable[str]) -> List[str]:
+        ids = list(ids)
+        seen = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT msg_id FROM processed WHERE msg_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                seen.update(r[0] for r in rows)
+        return [i for i in ids if i not in seen]
+
+    def mark_processed(self, msg_id: str, result: Optional[Dict[str, Any]] = None, engine: str = "", engine_version: str = "") -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed (msg_id, processed_at, engine, engine_version, result) VALUES (?, ?, ?, ?, ?)",
+                (msg_id, _now(), engine, engine_version, json.dumps(result, default=str) if result is not None else None),
+            )
+
+    def unmark(self, msg_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM processed WHERE msg_id = ?", (msg_id,))
+
+    def mark_skipped(self, msg_id: str, reason: str, version: str = "") -> None:
+        """Records a message triage decided not to fetch; it counts as processed from now on."""
+        self.mark_processed(msg_id, {"skipped": reason}, engine=SKIPPED_ENGINE, engine_version=version)
+
+    def clear_skipped(self) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM processed WHERE engine = ?", (SKIPPED_ENGINE,)).rowcount
+
+    def result_of(self, msg_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM processed WHERE msg_id = ?", (msg_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def applications(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT record FROM applications ORDER BY updated_at").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def save_applications(self, records: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO applications (app_id, updated_at, record) VALUES (?, ?, ?)",
+                [(r["id"], r.get("updated", _now()), json.dumps(r, default=str)) for r in records],
+            )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+def _read_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return dict({k: None for k in _KV_KEYS}, processed_ids=[])
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path: str, state: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+def open_state_store(app_cfg: Optional[Dict[str, Any]] = None):
+    """Picks the backend from app.state_backend (sqlite | json); sqlite imports state.json on first use."""
+    app_cfg = app_cfg or {}
+    backend = app_cfg.get("state_backend", "sqlite")
+    if backend == "json":
+        return JsonStateStore()
+    if backend != "sqlite":
+        raise ValueError(f"Unknown state backend: {backend}")
+    return SqliteStateStore(resolve_path(app_cfg.get("state_path", "data/state.sqlite")))
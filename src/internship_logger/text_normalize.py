@@ -0,0 +1,131 @@
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+_BLOCK_TAGS = {"p", "div", "br", "tr", "li", "ul", "ol", "table", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "hr", "section", "article", "header", "footer"}
+_SKIP_TAGS = {"script", "style", "head", "title", "noscript", "template"}
+# elements that never have an end tag (HTML living standard), so they never open a region
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "meta", "param",
+              "source", "track", "wbr"}
+
+class _HTMLToText(HTMLParser):
+    """Incremental HTML -> text: keeps text nodes, turns block tags into line breaks,
+    drops script/style and quoted-reply blocks (<blockquote>, gmail_quote divs).
+
+    Open elements are tracked by name, and an end tag closes everything up to its matching
+    start tag, so unclosed <p>/<li>/<td> and stray end tags can't leave a skip region open
+    (or close one early)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self._skip = 0
+        self._stack: List[Tuple[str, bool]] = []   # (tag, opened a skip region)
+
+    def _close(self, tag: str) -> None:
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                self._skip -= sum(skip for _, skip in self._stack[i:])
+                del self._stack[i:]
+                return
+        # a stray end tag with nothing to close is ignored
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.out.append("\n")
+        if tag in _VOID_TAGS:
+            return
+        if tag == "body":
+            self._close("head")   # <head> is often left unclosed
+        cls = dict(attrs).get("class") or ""
+        skip = tag in _SKIP_TAGS or tag == "blockquote" or "gmail_quote" in cls or "yahoo_quoted" in cls
+        self._skip += skip
+        self._stack.append((tag, skip))
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> and friends: self-closing syntax never opens an element
+        if tag in _BLOCK_TAGS:
+            self.out.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        self._close(tag)
+        if tag in _BLOCK_TAGS:
+            self.out.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.out.append(data)
+
+def html_to_text(html: str, chunk_size: int = 65536) -> str:
+    parser = _HTMLToText()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+    parser.close()
+    return "".join(parser.out)
+
+# everything from the first of these lines on is an earlier message in the thread
+_QUOTE_HEADER = re.compile(
+    r"^\s*(?:On .{0,200}wrote:\s*$|-{2,}\s*Original Message\s*-{2,}|-{2,}\s*Forwarded message\s*-{2,}|From: .+\n\s*(?:Sent|Date): )",
+    flags=re.I | re.M,
+)
+_SIGNATURE = re.compile(r"^-- ?$", flags=re.M)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# ATS footers, legal disclaimers and mailing-list chrome (one pattern per sentence to drop)
+BOILERPLATE = re.compile("|".join([
+    r"powered by (?:workday|greenhouse|lever)",
+    r"sent (?:via|from|by) (?:workday|greenhouse|lever)",
+    r"this (?:e-?mail|message) was (?:sent|generated) (?:by|from|automatically)",
+    r"myworkday(?:site)?\.com",
+    r"greenhouse\.io/(?:privacy|unsubscribe)",
+    r"lever\.co/(?:privacy|unsubscribe)",
+    r"\bunsubscribe\b",
+    r"manage (?:your )?(?:email )?(?:preferences|notifications)",
+    r"privacy (?:policy|notice|statement)",
+    r"(?:do not|don't|please don't) reply to this (?:e-?mail|message)",
+    r"this is an (?:automated|auto-generated) (?:e-?mail|message)",
+    r"confidentiality notice",
+    r"intended (?:only )?for the (?:use of the )?(?:individual|addressee|named recipient)",
+    r"if you (?:are not|have received this) .{0,40}(?:intended recipient|in error)",
+    r"equal (?:employment )?opportunity employer",
+    r"all rights reserved",
+    r"^\s*(?:view|open) (?:this email )?in (?:your )?browser",
+]), flags=re.I)
+
+def strip_quoted_and_boilerplate(text: str) -> str:
+    m = _QUOTE_HEADER.search(text)
+    if m and m.start() > 0:
+        text = text[:m.start()]
+    m = _SIGNATURE.search(text)
+    if m and m.start() > 0:
+        text = text[:m.start()]
+    keep = []
+    for ln in text.split("\n"):
+        if ln.lstrip().startswith(">"):
+            continue
+        if BOILERPLATE.search(ln):
+            # drop only the offending sentences: a paragraph (or a <td> block) may carry the
+            # status, role and date in the same line as an EEO or privacy disclaimer
+            ln = " ".join(part for part in _SENTENCE_END.split(ln) if not BOILERPLATE.search(part))
+            if not ln.strip():
+                continue
+        keep.append(ln)
+    return "\n".join(keep)
+
+def truncate_tokens(text: str, max_tokens: Optional[int]) -> str:
+    """Keeps roughly the first `max_tokens` whitespace-separated tokens, preserving line breaks."""
+    if not max_tokens:
+        return text
+    count = 0
+    for m in re.finditer(r"\S+", text):
+        count += 1
+        if count > max_tokens:
+            return text[:m.start()].rstrip()
+    return text
+
+def normalize_body(text: str, max_tokens: Optional[int] = None) -> str:
+    text = strip_quoted_and_boilerplate(text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return truncate_tokens(text, max_tokens)
@@ -0,0 +1,71 @@
+import html, re
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from . import metrics
+from .email_client import _get_header
+from .rule_engine import RULES
+
+# bump when the scoring changes; skips recorded under an older version can be re-checked with --retriage
+TRIAGE_VERSION = "2"
+# headers requested with format=metadata (the snippet, labels and sizeEstimate always come along)
+TRIAGE_HEADERS = ["Subject", "From", "Precedence", "List-Id"]
+
+# job alerts, talent-network mailers and event marketing from the same ATS senders the query catches
+NOISE = re.compile("|".join([
+    r"\bjob alert",
+    r"\bjobs? (?:you may|for you|matching|picked for you|recommended)",
+    r"\brecommended (?:jobs|roles|for you)",
+    r"\bnew (?:jobs|roles|openings) (?:at|for|in|near)",
+    r"\b(?:is|are|we'?re) hiring\b",
+    r"\btalent (?:community|network|pool)\b",
+    r"\bjoin our talent\b",
+    r"\b(?:webinar|newsletter|digest)\b",
+    r"\b(?:career fair|virtual event|info session|meet the team)\b",
+    r"\d+% off\b",
+]), flags=re.I)
+QUIET_CATEGORIES = {"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL", "CATEGORY_FORUMS"}
+
+class Decision(NamedTuple):
+    keep: bool
+    score: int
+    reason: str
+
+def score_metadata(msg: Dict[str, Any], min_score: int = 0) -> Decision:
+    """Cheap relevance score from headers + snippet: status phrases count for, job-alert wording,
+    promotional categories and bulk-mail headers count against. Mail with no signal either way
+    scores 0 and is kept at the default threshold; mail with a status phrase is always kept
+    (rejections often invite you to "join our talent community", and ATS senders set List-Id)."""
+    headers = msg.get("payload", {}).get("headers", [])
+    subject = _get_header(headers, "Subject")
+    snippet = html.unescape(msg.get("snippet", ""))
+    score, why = 0, []
+    hits = RULES.hits(subject, snippet)
+    labels = {h.label for h in hits if h.kind == "status"}
+    if labels:
+        score += 2 if any(h.in_subject for h in hits if h.kind == "status") else 1
+        why.append("status:" + "/".join(sorted(labels)))
+    if not labels and (NOISE.search(subject) or NOISE.search(snippet)):
+        score -= 2
+        why.append("job_alert")
+    quiet = QUIET_CATEGORIES.intersection(msg.get("labelIds", []))
+    if quiet:
+        score -= 1
+        why.append(min(quiet).lower())
+    if _get_header(headers, "List-Id") or _get_header(headers, "Precedence").lower() in ("bulk", "list"):
+        score -= 1
+        why.append("bulk")
+    return Decision(bool(labels) or score >= min_score, score, f"score={score} " + ",".join(why) if why else f"score={score}")
+
+def triage(metas: List[Dict[str, Any]], min_score: int = 0) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Splits metadata responses into (ids to fetch in full, [(skipped id, reason)])."""
+    keep, skipped = [], []
+    for msg in metas:
+        d = score_metadata(msg, min_score)
+        if d.keep:
+            keep.append(msg["id"])
+        else:
+            skipped.append((msg["id"], d.reason))
+            metrics.inc("triage_skipped_bytes", int(msg.get("sizeEstimate", 0)))
+    metrics.inc("triage", len(keep), decision="keep")
+    metrics.inc("triage", len(skipped), decision="skip")
+    return keep, skipped
@@ -0,0 +1,85 @@
+import os, signal, threading, time
+from typing import Any, Callable, Dict, Optional
+
+from .engines import loaded_engines, unload_engines
+from .metrics import peak_rss_mb
+
+def rss_mb() -> float:
+    """Current resident set size (ru_maxrss is only the peak, which never goes back down)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        # no /proc (macOS, Windows): the peak is the best available stand-in
+        return peak_rss_mb()
+
+class PollInterval:
+    """Seconds until the next poll: `min_s` right after new mail, then `backoff`x longer per idle poll up to `max_s`."""
+
+    def __init__(self, min_s: float = 60, max_s: float = 900, backoff: float = 2.0):
+        self.min_s = max(1.0, float(min_s))
+        self.max_s = max(self.min_s, float(max_s))
+        self.backoff = max(1.0, float(backoff))
+        self.current = self.min_s
+
+    def update(self, new_messages: int) -> float:
+        self.current = self.min_s if new_messages else min(self.max_s, self.current * self.backoff)
+        return self.current
+
+def _install_handlers(stop: threading.Event) -> Dict[int, Any]:
+    def _handler(signum, frame):
+        if stop.is_set():
+            # second signal: don't wait for the cycle in flight
+            raise SystemExit(128 + signum)
+        print(f"[WATCH] {signal.Signals(signum).name} received; finishing the current cycle")
+        stop.set()
+    if threading.current_thread() is not threading.main_thread():
+        return {}
+    return {sig: signal.signal(sig, _handler) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+def watch(run_once: Callable[[], int], watch_cfg: Optional[Dict[str, Any]] = None,
+          stop: Optional[threading.Event] = None) -> int:
+    """Calls `run_once` (returns the number of new messages) until SIGTERM/SIGINT or `stop` is set.
+
+    Engines stay loaded between polls. They are unloaded when RSS passes `memory_limit_mb`, or
+    after `idle_unload_after` seconds without new mail; the next message reloads them.
+    Returns the number of cycles run.
+    """
+    wc = watch_cfg or {}
+    stop = stop or threading.Event()
+    interval = PollInterval(wc.get("min_interval", 60), wc.get("max_interval", 900), wc.get("backoff", 2.0))
+    limit_mb = wc.get("memory_limit_mb")
+    idle_unload = wc.get("idle_unload_after")
+    previous = _install_handlers(stop)
+    last_activity = time.monotonic()
+    cycles = 0
+    print(f"[WATCH] polling every {interval.min_s:.0f}-{interval.max_s:.0f}s; SIGTERM or Ctrl-C to stop")
+    try:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                new = run_once()
+            except Exception as e:
+                # a bad cycle (network, quota) shouldn't end the daemon; back off and retry
+                print(f"[WATCH] cycle failed: {e!r}")
+                new = 0
+            cycles += 1
+            if new:
+                last_activity = time.monotonic()
+            rss = rss_mb()
+            loaded = loaded_engines()
+            if loaded and limit_mb and rss > float(limit_mb):
+                print(f"[WATCH] rss {rss:.0f}MB over {float(limit_mb):.0f}MB; unloading {', '.join(loaded)}")
+                unload_engines()
+            elif loaded and idle_unload and time.monotonic() - last_activity > float(idle_unload):
+                print(f"[WATCH] idle for {float(idle_unload):.0f}s+; unloading {', '.join(loaded)}")
+                unload_engines()
+            delay = interval.update(new)
+            print(f"[WATCH] cycle {cycles}: {new} new message(s) in {time.perf_counter() - t0:.2f}s, "
+                  f"rss={rss:.0f}MB; next poll in {delay:.0f}s")
+            stop.wait(delay)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    print(f"[WATCH] stopped after {cycles} cycle(s)")
+    return cycles
@@ -0,0 +1,115 @@
+import argparse, json, os, time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .settings import resolve_path
+
+# torch/transformers are imported inside the loaders, so options and validation work without them
+BACKENDS = ("torch", "quantized", "onnx")
+
+def backend_options(cfg_block: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "backend": cfg_block.get("backend", "torch"),
+        "intra_op_threads": cfg_block.get("intra_op_threads"),
+        "max_length": cfg_block.get("max_length"),
+        "local_files_only": bool(cfg_block.get("local_files_only", False)),
+        "onnx_dir": cfg_block.get("onnx_dir", "data/onnx"),
+    }
+
+def _tokenizer(name: str, opts: Dict[str, Any]):
+    from transformers import AutoTokenizer
+    tok = AutoTokenizer.from_pretrained(name, local_files_only=opts["local_files_only"])
+    if opts.get("max_length"):
+        tok.model_max_length = int(opts["max_length"])
+    return tok
+
+def _onnx_model(kind: str, name: str, opts: Dict[str, Any]):
+    try:
+        import onnxruntime as ort
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForTokenClassification
+    except ImportError as e:
+        raise RuntimeError("nlp_transformer.backend=onnx needs `pip install optimum[onnxruntime]`") from e
+    cls = ORTModelForSequenceClassification if kind == "seq" else ORTModelForTokenClassification
+    so = ort.SessionOptions()
+    if opts.get("intra_op_threads"):
+        so.intra_op_num_threads = int(opts["intra_op_threads"])
+    # export once, then reuse the saved graph (no network, no re-export) on later runs
+    export_dir = os.path.join(resolve_path(opts["onnx_dir"]), name.replace("/", "__"))
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        return cls.from_pretrained(export_dir, session_options=so)
+    model = cls.from_pretrained(name, export=True, local_files_only=opts["local_files_only"], session_options=so)
+    model.save_pretrained(export_dir)
+    return model
+
+def _torch_model(kind: str, name: str, opts: Dict[str, Any]):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification
+    cls = AutoModelForSequenceClassification if kind == "seq" else AutoModelForTokenClassification
+    model = cls.from_pretrained(name, local_files_only=opts["local_files_only"])
+    model.eval()
+    if opts["backend"] == "quantized":
+        # int8 weights for every Linear layer; activations stay float and are quantized on the fly
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def build_pipelines(zs_name: str, ner_name: str, opts: Optional[Dict[str, Any]] = None) -> Tuple[Any, Any]:
+    """Zero-shot and NER pipelines on the requested backend (torch | quantized | onnx)."""
+    opts = opts or backend_options({})
+    if opts["backend"] not in BACKENDS:
+        raise ValueError(f"Unknown nlp_transformer.backend {opts['backend']!r}; choose one of {', '.join(BACKENDS)}")
+    import torch
+    from transformers import pipeline
+    if opts.get("intra_op_threads"):
+        torch.set_num_threads(int(opts["intra_op_threads"]))
+    load = _onnx_model if opts["backend"] == "onnx" else _torch_model
+    zs = pipeline("zero-shot-classification", model=load("seq", zs_name, opts), tokenizer=_tokenizer(zs_name, opts))
+    ner = pipeline("ner", model=load("tok", ner_name, opts), tokenizer=_tokenizer(ner_name, opts), aggregation_strategy="simple")
+    return zs, ner
+
+def load_fixtures(path: str) -> List[Dict[str, Any]]:
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                row["date"] = datetime.fromisoformat(row["date"])
+                rows.append(row)
+    return rows
+
+def compare_backends(cfg_block: Dict[str, Any], fixtures: List[Dict[str, Any]], backend: str) -> Dict[str, Any]:
+    """Runs the fixtures through the torch baseline and `backend`; reports agreement and timing."""
+    from . import nlp_xfmr
+    items = [(r["subject"], r["from"], r["body"], r["date"]) for r in fixtures]
+    report: Dict[str, Any] = {"n": len(items), "backend": backend}
+    outputs = {}
+    for name in ("torch", backend):
+        nlp_xfmr.unload_models()
+        block = dict(cfg_block, backend=name)
+        t0 = time.perf_counter()
+        nlp_xfmr._ensure_models(*nlp_xfmr._model_names(block), backend_options(block))
+        t1 = time.perf_counter()
+        outputs[name] = nlp_xfmr.parse_emails_transformer(block, items)
+        report[f"{name}_load_s"] = round(t1 - t0, 3)
+        report[f"{name}_infer_s"] = round(time.perf_counter() - t1, 3)
+    nlp_xfmr.unload_models()
+    for field in ("status", "company", "role"):
+        base, cand = outputs["torch"], outputs[backend]
+        report[f"{field}_agreement"] = sum(a[field] == b[field] for a, b in zip(base, cand)) / max(1, len(items))
+        if all("expected" in r for r in fixtures):
+            for name in ("torch", backend):
+                hits = sum(o[field] == r["expected"][field] for o, r in zip(outputs[name], fixtures))
+                report[f"{name}_{field}_accuracy"] = hits / max(1, len(items))
+    report["speedup"] = round(report["torch_infer_s"] / max(report[f"{backend}_infer_s"], 1e-9), 2)
+    return report
+
+def main():
+    from .settings import load_settings
+    parser = argparse.ArgumentParser(description="Compare an accelerated transformer backend against the torch baseline")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], default="quantized")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "..", "..", "tests", "fixtures", "emails.jsonl"))
+    args = parser.parse_args()
+    cfg = load_settings()
+    print(json.dumps(compare_backends(cfg.nlp_transformer or {}, load_fixtures(args.fixtures), args.backend), indent=2))
+
+if __name__ == "__main__":
+    main()
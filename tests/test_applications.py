@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from src.internship_logger.applications import ApplicationIndex, application_row, normalize_company, normalize_role
+from src.internship_logger.state_store import JsonStateStore, SqliteStateStore
+
+
+def _parsed(status, company="Acme Inc.", role="Software Engineering Intern"):
+    return {"status": status, "company": company, "role": role, "date_applied": datetime(2024, 5, 6)}
+
+
+def test_normalization():
+    assert normalize_company("Acme, Inc.") == normalize_company("ACME Recruiting") == "acme"
+    assert normalize_role("Software Engineer Intern - Summer 2025") == normalize_role("SWE Internship") == "software engineering"
+    assert normalize_role("Intern") == normalize_role("Unknown") == ""
+
+
+def test_status_moves_forward_only_and_threads_join():
+    idx = ApplicationIndex()
+    rec, change = idx.update("m1", "t1", _parsed("Applied"))
+    assert change == "new" and rec["id"] == "m1"
+    # different wording of the company, no thread in common, role-less rejection email
+    assert idx.update("m2", "t2", _parsed("OA", company="ACME Recruiting"))[1] == "advanced"
+    assert idx.update("m3", "t3", _parsed("Rejected", role="Intern"))[1] == "advanced"
+    assert idx.update("m4", "t3", _parsed("Interview", company="Unknown"))[1] == "unchanged"
+    assert idx.update("m3", "t3", _parsed("Rejected"))[1] == "unchanged"
+    assert len(idx) == 1 and rec["status"] == "Rejected" and rec["emails"] == ["m1", "m2", "m3", "m4"]
+    row = application_row(rec, 14, "now")
+    assert row["EmailId"] == "m1" and row["ThreadId"] == "t1" and row["FollowUp Due"] == "2024-05-20"
+
+
+def test_other_roles_and_companies_stay_separate():
+    idx = ApplicationIndex()
+    idx.update("m1", "", _parsed("Applied"))
+    assert idx.update("m2", "", _parsed("Applied", role="Data Science Intern"))[1] == "new"
+    assert idx.update("m3", "", _parsed("Applied", company="Acme Robotics"))[1] == "new"
+    assert idx.update("m4", "", _parsed("Applied", company="Unknown"))[1] == "new"
+    assert idx.update("m5", "", _parsed("Applied", company="Unknown"))[1] == "new"
+    assert len(idx) == 5
+
+
+def test_index_persists_in_both_state_stores(tmp_path):
+    for make in (lambda: SqliteStateStore(str(tmp_path / "s.sqlite"), legacy_json=None),
+                 lambda: JsonStateStore(str(tmp_path / "s.json"))):
+        store = make()
+        idx = ApplicationIndex(store.applications())
+        idx.update("m1", "t1", _parsed("Applied"))
+        idx.save(store)
+        store.close()
+        reopened = ApplicationIndex(make().applications())
+        assert reopened.match("Acme", "", "") is not None and reopened.match("", "", "t1")["id"] == "m1"
@@ -0,0 +1,81 @@
+import csv
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.internship_logger import backfill as bf
+from src.internship_logger.gmail_query import QueryError, compile_query
+from src.internship_logger.sheets_writer import HEADERS
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def _fields(**kw):
+    base = {"subject": "", "from": "", "to": "", "body": "", "labels": ["Inbox"], "date": NOW, "attachments": []}
+    base.update(kw)
+    return base
+
+
+def test_query_or_binds_tighter_than_and():
+    q = compile_query('in:inbox newer_than:30d ("application received" OR "thank you for applying") OR from:(greenhouse.io)', now=NOW)
+    assert q(_fields(body="Thank you for applying to Acme"))
+    assert q(_fields(**{"from": "no-reply@greenhouse.io"}))
+    assert not q(_fields(body="Application received", labels=["Archived"]))
+    assert not q(_fields(body="application received", date=datetime(2023, 1, 1, tzinfo=timezone.utc)))
+    assert not q(_fields(body="weekly newsletter"))
+
+
+def test_query_negation_groups_and_unknown_labels():
+    q = compile_query("-subject:newsletter {interview assessment} after:2024/05/01", now=NOW)
+    assert q(_fields(subject="Interview invite", labels=None))
+    assert not q(_fields(subject="Newsletter: interview tips"))
+    assert not q(_fields(subject="Online assessment", date=datetime(2024, 4, 1, tzinfo=timezone.utc)))
+    with pytest.raises(QueryError):
+        compile_query("(unclosed")
+
+
+def _eml(i, subject, body, date="Mon, 06 May 2024 10:00:00 +0000"):
+    return (f"Message-ID: <m{i}@example.com>\nX-GM-THRID: {1000 + i}\nX-Gmail-Labels: Inbox,Category Updates\n"
+            f"From: Recruiting <jobs@greenhouse.io>\nTo: me@example.com\nSubject: {subject}\nDate: {date}\n"
+            f"Content-Type: text/plain; charset=utf-8\n\n{body}\n")
+
+
+def _mbox(path, messages):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, raw in enumerate(messages):
+            f.write(f"From {1000 + i}@xxx Mon May 06 10:00:00 +0000 2024\n{raw}\n")
+
+
+def test_iter_mbox_splits_on_separator_lines_only(tmp_path):
+    path = tmp_path / "mail.mbox"
+    _mbox(path, [
+        _eml(0, "one", "From the team at Acme,\n>From here on it is escaped"),
+        _eml(1, "two", "hello"),
+    ])
+    msgs = list(bf.iter_mbox(str(path)))
+    assert len(msgs) == 2
+    assert b"From the team at Acme" in msgs[0] and b"\nFrom here on" in msgs[0]
+    parsed = bf.parse_message(msgs[1])
+    assert parsed["id"] == "m1@example.com" and parsed["threadId"] == format(1001, "x")
+    assert parsed["labels"] == ["Inbox", "Category Updates"] and parsed["body"] == "hello"
+
+
+def test_backfill_writes_tracker_rows(tmp_path):
+    archive = tmp_path / "takeout"
+    archive.mkdir()
+    _mbox(archive / "All mail.mbox", [
+        _eml(0, "Thank you for applying to Acme", "We received your application for the Software Engineering Intern role."),
+        _eml(1, "Weekly digest", "Nothing about jobs here.", date="Mon, 06 May 2024 11:00:00 +0000"),
+    ])
+    (archive / "extra.eml").write_text(_eml(2, "Interview invitation - Globex", "We'd like to schedule an interview."))
+    cfg = SimpleNamespace(app={"timezone": "UTC", "followup_days": 14}, gmail={"query": "x"}, nlp={}, nlp_spacy={},
+                          nlp_transformer={})
+    out = tmp_path / "out" / "apps.csv"
+    stats = bf.backfill(str(archive), str(out), cfg, query='"applying" OR interview', engine_name="rules", batch_size=1)
+    assert stats == {"scanned": 3, "matched": 2, "written": 2}
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == HEADERS
+    assert [r["EmailId"] for r in rows] == ["m0@example.com", "m2@example.com"]
+    assert rows[0]["Date Applied"] == "2024-05-06" and rows[0]["FollowUp Due"] == "2024-05-20"
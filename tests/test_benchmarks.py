@@ -0,0 +1,19 @@
+from benchmarks.corpus import make_corpus
+from benchmarks.run import compare, run
+from src.internship_logger.settings import load_settings
+
+
+def test_corpus_is_deterministic():
+    assert make_corpus(20, seed=3) == make_corpus(20, seed=3)
+    assert len({m["id"] for m in make_corpus(50)}) == 50
+
+
+def test_suite_runs_offline_end_to_end():
+    report = run(n=12, repeat=1, engine_names=["rules"], cfg=load_settings())
+    serial, pipelined = report["process_once"]["serial"], report["process_once"]["pipelined"]
+    # emails about the same application share a row (and a follow-up)
+    assert 0 < serial["rows_written"] < 12 and serial["events"] <= serial["rows_written"]
+    assert (pipelined["rows_written"], pipelined["events"]) == (serial["rows_written"], serial["events"])
+    assert report["sheets"]["batch_writer"]["api_calls"] < report["sheets"]["upsert_row"]["api_calls"]
+    slower = dict(report, extract_plain_text=dict(report["extract_plain_text"], median_s=report["extract_plain_text"]["median_s"] * 2 + 1))
+    assert compare(report, slower) and not compare(report, report)
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from src.internship_logger.cache import DiskCache
+from src.internship_logger.result_cache import ResultCache, open_result_cache, parse_cached
+
+
+def test_disk_cache_roundtrip_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path / "c.sqlite"), namespace="t", max_entries=10)
+    cache.put_many({"a": b"1", "b": b"2"})
+    assert cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 2}
+    cache.close()
+    # survives a reopen
+    assert DiskCache(str(tmp_path / "c.sqlite"), namespace="t").get("a") == b"1"
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "c.sqlite"), max_entries=3)
+    cache.put_many({"a": b"1", "b": b"2", "c": b"3"})
+    cache.get("a")
+    cache.put("d", b"4")
+    assert sorted(cache.get_many(["a", "b", "c", "d"])) == ["a", "c", "d"]
+
+
+def test_disk_cache_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    DiskCache(path, namespace="x").put("k", b"x")
+    assert DiskCache(path, namespace="y").get("k") is None
+
+
+def _fake_parse(calls):
+    def parse(items):
+        calls.append(len(items))
+        return [{"status": "Applied", "company": subj.split()[-1], "role": "Intern", "date_applied": when} for subj, _, _, when in items]
+    return parse
+
+
+def test_result_cache_skips_seen_emails(tmp_path):
+    items = [(f"Thanks for applying to Co{i}", "x@y.com", "body", datetime(2025, 1, i + 1)) for i in range(3)]
+    cache = ResultCache(str(tmp_path / "r.sqlite"), "rules", "fp1")
+    calls = []
+    first = parse_cached(cache, _fake_parse(calls), items[:2])
+    again = parse_cached(cache, _fake_parse(calls), items)
+    assert calls == [2, 1]
+    assert again[:2] == first and again[2]["company"] == "Co2"
+    assert cache.stats()["hits"] == 2
+
+
+def test_result_cache_keys_depend_on_engine_and_config(tmp_path):
+    path = str(tmp_path / "r.sqlite")
+    item = ("subject", "from", "body", datetime(2025, 1, 1))
+    keys = {ResultCache(path, e, fp).key(*item) for e, fp in [("rules", "a"), ("spacy", "a"), ("rules", "b")]}
+    assert len(keys) == 3
+
+
+def test_result_cache_fingerprint_tracks_engine_code_version(tmp_path):
+    nlp = {"result_cache": {"enabled": True, "path": str(tmp_path / "r.sqlite")}}
+    item = ("subject", "from", "body", datetime(2025, 1, 1))
+    old, new = (open_result_cache(nlp, "rules", "rules", {}, v) for v in ("1", "2"))
+    assert old.key(*item) != new.key(*item)
@@ -1,2 +1,138 @@
+import json
+
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMock, HttpMockSequence
+
+from benchmarks.fakes import FakeGmailHttp
+from src.internship_logger import email_client
+
+
 def test_placeholder():
     assert True
+
+
+def _mailbox(ids):
+    return [{"id": i, "threadId": "t" + i, "payload": {"mimeType": "text/plain", "headers": [], "body": {"data": ""}}}
+            for i in ids]
+
+
+@pytest.fixture
+def gmail():
+    return build("gmail", "v1", http=HttpMock(None, {"status": "200"}), static_discovery=True)
+
+
+def test_get_messages_batches_and_keeps_order(gmail):
+    ids = [f"m{i:03d}" for i in range(23)]
+    fake = FakeGmailHttp(_mailbox(ids))
+    msgs = email_client.get_messages(ids, batch_size=10, service=gmail, http=fake, backoff=0)
+    assert [m["id"] for m in msgs] == ids
+    assert sorted(len(b) for b in fake.batches) == [3, 10, 10]
+
+
+def test_get_messages_retries_throttled_items(gmail):
+    ids = ["m0", "m1", "m2", "m3", "m4"]
+    fake = FakeGmailHttp(_mailbox(["m0", "m1", "m3", "m4"]), fail_once={"m1", "m4"})
+    msgs = email_client.get_messages(ids, batch_size=5, format="metadata", service=gmail, http=fake, backoff=0)
+    assert [m["id"] for m in msgs] == ["m0", "m1", "m3", "m4"]
+    assert all("body" not in m["payload"] for m in msgs)
+    assert fake.batches[1] == ["m1", "m4"]
+
+
+def _gmail_seq(*responses):
+    seq = [({"status": str(status)}, json.dumps(body)) for status, body in responses]
+    return build("gmail", "v1", http=HttpMockSequence(seq), static_discovery=True)
+
+
+def test_sync_messages_full_scan_paginates():
+    svc = _gmail_seq(
+        (200, {"historyId": "100"}),
+        (200, {"messages": [{"id": "a"}, {"id": "b"}], "nextPageToken": "p2"}),
+        (200, {"messages": [{"id": "c"}]}),
+    )
+    refs, history_id = email_client.sync_messages("label:x", service=svc)
+    assert [r["id"] for r in refs] == ["a", "b", "c"]
+    assert history_id == "100"
+
+
+def test_sync_messages_incremental_uses_history():
+    svc = _gmail_seq(
+        (200, {"history": [{"messagesAdded": [{"message": {"id": "d"}}, {"message": {"id": "e"}}]}], "historyId": "120"}),
+        (200, {"messages": [{"id": "d"}, {"id": "old"}]}),
+    )
+    refs, history_id = email_client.sync_messages("label:x", history_id="100", since=1_700_000_000, service=svc)
+    assert [r["id"] for r in refs] == ["d"]
+    assert history_id == "120"
+
+
+def test_sync_messages_idle_mailbox_costs_one_call():
+    svc = _gmail_seq((200, {"historyId": "130"}))
+    assert email_client.sync_messages("label:x", history_id="130", service=svc) == ([], "130")
+
+
+def test_sync_messages_falls_back_when_history_expired():
+    svc = _gmail_seq(
+        (404, {"error": {"code": 404}}),
+        (200, {"historyId": "200"}),
+        (200, {"messages": [{"id": "a"}]}),
+    )
+    refs, history_id = email_client.sync_messages("label:x", history_id="1", service=svc)
+    assert [r["id"] for r in refs] == ["a"]
+    assert history_id == "200"
+
+
+def test_sync_messages_listing_error_keeps_sync_point():
+    svc = _gmail_seq(
+        (200, {"historyId": "300"}),
+        (200, {"messages": [{"id": "a"}], "nextPageToken": "p2"}),
+        (503, {"error": {"code": 503}}),
+    )
+    assert email_client.sync_messages("label:x", service=svc) == ([], None)
+    svc = _gmail_seq(
+        (200, {"history": [{"messagesAdded": [{"message": {"id": "d"}}]}], "historyId": "120"}),
+        (429, {"error": {"code": 429}}),
+    )
+    assert email_client.sync_messages("label:x", history_id="100", service=svc) == ([], None)
+
+def _b64(s):
+    import base64
+    return base64.urlsafe_b64encode(s.encode()).decode().rstrip("=")
+
+def test_extract_plain_text_prefers_plain_alternative():
+    msg = {"payload": {"mimeType": "multipart/alternative", "headers": [{"name": "Subject", "value": "Thanks"}], "parts": [
+        {"mimeType": "text/plain", "body": {"data": _b64("Thank you for applying to Acme.")}},
+        {"mimeType": "text/html", "body": {"data": _b64("<p>Thank you for applying to Acme.</p>")}},
+    ]}}
+    assert email_client.extract_plain_text(msg)[2] == "Thank you for applying to Acme."
+
+def test_extract_plain_text_html_only():
+    html = "<html><head><style>p{}</style></head><body><p>Your application&nbsp;was received.</p><script>x()</script></body></html>"
+    msg = {"payload": {"mimeType": "text/html", "headers": [], "body": {"data": _b64(html)}}}
+    assert email_client.extract_plain_text(msg)[2] == "Your application\xa0was received."
+
+def test_extract_plain_text_strips_quotes_boilerplate_and_caps_tokens():
+    body = ("Hi Sam,\nWe received your application for Data Intern.\n"
+            "Powered by Greenhouse | Privacy Policy\nClick here to unsubscribe.\n"
+            "On Mon, Mar 3, 2025 at 9:00 AM Sam <sam@x.com> wrote:\n> Interview next week?\n")
+    msg = {"payload": {"mimeType": "text/plain", "headers": [], "body": {"data": _b64(body)}}}
+    assert email_client.extract_plain_text(msg)[2] == "Hi Sam,\nWe received your application for Data Intern."
+    assert email_client.extract_plain_text(msg, max_tokens=4)[2] == "Hi Sam,\nWe received"
+
+def test_inline_disclaimer_only_drops_its_sentence():
+    from src.internship_logger.text_normalize import normalize_body
+    body = ("Hi Alex,\nThank you for applying to the Software Engineering Intern role at Stripe. We received your "
+            "application on March 3, 2025. Stripe is an equal opportunity employer and our privacy policy explains more.\n"
+            "\nBest,\nStripe")
+    assert normalize_body(body) == ("Hi Alex,\nThank you for applying to the Software Engineering Intern role at Stripe. "
+                                    "We received your application on March 3, 2025.\n\nBest,\nStripe")
+
+@pytest.mark.parametrize("html,text", [
+    ("<head><base href=x><title>t</title></head><body><p>Thank you for applying</p>", "Thank you for applying"),
+    ("<blockquote><p>quoted</blockquote><p>Real body", "Real body"),
+    ("<html><head><meta charset=utf-8><style>p{}</style><body><table><tr><td>Your application</tr><tr><td>was"
+     "</table></span></div><wbr> received<col><source>.", "Your application\nwas\n received."),
+    ("<div>Hi<div class=gmail_quote><div>old</div><p>older</div><li>Next steps", "Hi\nNext steps"),
+])
+def test_html_to_text_survives_unbalanced_markup(html, text):
+    from src.internship_logger.text_normalize import html_to_text
+    assert "\n".join(line for line in html_to_text(html).splitlines() if line.strip()) == text
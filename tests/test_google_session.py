@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+
+from src.internship_logger.google_session import GoogleSession
+
+
+class FakeCreds:
+    def __init__(self):
+        self.valid = False
+        self.refreshes = 0
+
+    def refresh(self, request):
+        time.sleep(0.05)
+        self.refreshes += 1
+        self.valid = True
+
+    def to_json(self):
+        return json.dumps({"token": "t", "refreshes": self.refreshes})
+
+    def before_request(self, request, method, url, headers):
+        headers["authorization"] = "Bearer t"
+
+
+def test_concurrent_refreshes_collapse_into_one(tmp_path):
+    creds = FakeCreds()
+    session = GoogleSession(credentials=creds, token_file=str(tmp_path / "token.json"))
+    threads = [threading.Thread(target=creds.refresh, args=(None,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert creds.refreshes == 1
+    assert session.credentials() is creds
+    assert json.loads((tmp_path / "token.json").read_text())["refreshes"] == 1
+
+
+def test_clients_are_built_once_and_transports_are_pooled(tmp_path):
+    creds = FakeCreds()
+    creds.valid = True
+    session = GoogleSession(credentials=creds, token_file=str(tmp_path / "token.json"))
+    assert session.service("gmail", "v1") is session.service("gmail", "v1")
+    with session.http() as first:
+        with session.http() as second:
+            assert first is not second   # never shared while checked out
+    # later batches, on other threads, get the idle transports (and their open connections) back
+    seen = []
+    def grab():
+        with session.http() as h:
+            seen.append(h)
+    t = threading.Thread(target=grab)
+    t.start()
+    t.join()
+    assert seen[0] in (first, second)
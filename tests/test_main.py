@@ -0,0 +1,40 @@
+import contextlib
+import dataclasses
+import io
+
+from benchmarks.corpus import make_corpus
+from benchmarks.fakes import google_fakes
+from src.internship_logger import engines, main as app_main
+from src.internship_logger.settings import load_settings
+from src.internship_logger.state_store import SqliteStateStore
+
+
+def _run(monkeypatch, cfg, store_path, corpus, calendar_fail=None):
+    monkeypatch.setattr(app_main, "load_settings", lambda: cfg)
+    monkeypatch.setattr(app_main, "open_state_store", lambda app_cfg: SqliteStateStore(store_path, legacy_json=None))
+    with google_fakes(corpus) as (gmail_http, cal_http, ws):
+        cal_http.fail = calendar_fail
+        with contextlib.redirect_stdout(io.StringIO()):
+            app_main.process_once(serial=True, engine_name="rules")
+    engines.unload_engines()
+    return cal_http
+
+
+def test_failed_followups_hold_back_the_sync_point(monkeypatch, tmp_path):
+    base = load_settings()
+    cfg = dataclasses.replace(
+        base, app=dict(base.app, dry_run=False, metrics={"summary": False}), gmail=dict(base.gmail, sync="incremental"),
+        nlp=dict(base.nlp or {}, result_cache={"enabled": False}), calendar=dict(base.calendar, enabled=True),
+    )
+    corpus, path = make_corpus(8, seed=5), str(tmp_path / "state.sqlite")
+
+    _run(monkeypatch, cfg, path, corpus, calendar_fail=403)
+    store = SqliteStateStore(path, legacy_json=None)
+    # the follow-ups failed: their messages stay unprocessed and the bookmark doesn't move past them
+    assert store.get("history_id") is None and store.unprocessed(m["id"] for m in corpus)
+    store.close()
+
+    cal = _run(monkeypatch, cfg, path, corpus)
+    store = SqliteStateStore(path, legacy_json=None)
+    assert store.get("history_id") == "1000" and not store.unprocessed(m["id"] for m in corpus)
+    assert cal.events
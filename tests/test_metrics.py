@@ -0,0 +1,51 @@
+from src.internship_logger import metrics
+from src.internship_logger.metrics import Metrics
+from src.internship_logger.sheets_writer import SheetBatchWriter
+
+from benchmarks.fakes import FakeWorksheet
+
+
+def test_counters_and_timers_aggregate_by_labels():
+    m = Metrics()
+    m.inc("google_api_calls", 3, api="gmail", method="messages.get")
+    m.inc("google_api_calls", api="sheets", method="append_rows")
+    with m.timer("stage", stage="fetch"):
+        pass
+    m.observe("stage", 0.5, stage="fetch")
+    assert m.count("google_api_calls") == 4
+    assert m.count("google_api_calls", api="gmail") == 3
+    timer = m.snapshot()["timers"][0]
+    assert timer["count"] == 2 and timer["max_s"] == 0.5
+
+
+def test_prometheus_textfile_format():
+    m = Metrics()
+    m.inc("model_inputs", 16, model="zero_shot")
+    m.observe("model_forward", 0.25, model="zero_shot")
+    text = m.to_prometheus()
+    assert "# TYPE ial_model_inputs_total counter" in text
+    assert 'ial_model_inputs_total{model="zero_shot"} 16' in text
+    assert 'ial_model_forward_seconds_sum{model="zero_shot"} 0.25' in text
+    assert text.endswith("\n")
+
+    # two label sets: every family's samples sit together under its one TYPE line
+    m.observe("stage", 1.0, stage="a")
+    m.observe("stage", 2.0, stage="b")
+    families, family = [], None
+    for ln in m.to_prometheus().splitlines():
+        if ln.startswith("# TYPE "):
+            family = ln.split()[2]
+            families.append(family)
+        else:
+            name = ln.split("{")[0].split()[0]
+            assert name == family or (name.startswith(family + "_") and name[len(family) + 1:] in ("count", "sum"))
+    assert len(families) == len(set(families))
+
+
+def test_sheet_writes_are_counted():
+    metrics.METRICS.reset()
+    with SheetBatchWriter(FakeWorksheet()) as writer:
+        writer.add({"EmailId": "a"})
+        writer.add({"EmailId": "b"})
+    assert metrics.METRICS.count("google_api_calls", api="sheets", method="append_rows") == 2
+    assert metrics.METRICS.count("google_api_calls", api="sheets", method="col_values") == 1
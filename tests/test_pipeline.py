@@ -0,0 +1,43 @@
+import random
+import time
+
+import pytest
+
+from src.internship_logger.pipeline import run_serial, run_staged
+
+
+def _stages(log):
+    def fetch(ids):
+        time.sleep(random.uniform(0, 0.01))
+        return [f"msg-{i}" for i in ids]
+
+    def infer(msgs):
+        return [m.upper() for m in msgs]
+
+    def write(parsed):
+        log.append(parsed)
+
+    return fetch, infer, write
+
+
+def test_staged_matches_serial_order():
+    chunks = [[i, i + 1] for i in range(0, 40, 2)]
+    serial_log, staged_log = [], []
+    run_serial(chunks, *_stages(serial_log))
+    times = run_staged(chunks, *_stages(staged_log), fetch_workers=4, queue_size=1)
+    assert staged_log == serial_log
+    assert times.items == {"fetch": 20, "infer": 20, "write": 20}
+
+
+def test_staged_propagates_stage_errors():
+    def infer(msgs):
+        if "msg-4" in msgs:
+            raise RuntimeError("model blew up")
+        return msgs
+
+    written = []
+    fetch, _, write = _stages(written)
+    with pytest.raises(RuntimeError, match="model blew up"):
+        run_staged([[i] for i in range(10)], fetch, infer, write, fetch_workers=2)
+    # nothing after the failing chunk is committed
+    assert written == [["msg-0"], ["msg-1"], ["msg-2"], ["msg-3"]]
@@ -0,0 +1,35 @@
+import re
+from datetime import datetime
+
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMock
+
+from benchmarks.fakes import FakeCalendarHttp
+from src.internship_logger import reminder
+
+
+def _items(*ids):
+    return [{"company": "Acme", "role": "SWE Intern", "followup_dt": datetime(2025, 4, 1), "email_id": i} for i in ids]
+
+
+def test_event_ids_are_valid_and_stable():
+    eid = reminder.followup_event_id("18c2f3a9b7d1e0f4")
+    assert eid == reminder.followup_event_id("18c2f3a9b7d1e0f4")
+    assert re.fullmatch(r"[a-v0-9]{5,1024}", eid)
+
+
+def test_followups_are_batched_and_idempotent():
+    cal = build("calendar", "v3", http=HttpMock(None, {"status": "200"}), static_discovery=True)
+    fake = FakeCalendarHttp(fail_ids={reminder.followup_event_id("bad")})
+    first = reminder.create_followup_events("primary", _items("a", "b", "bad"), service=cal, http=fake)
+    assert [r["status"] for r in first] == ["created", "created", "error"]
+    assert fake.calls["batch"] == 1
+
+    again = reminder.create_followup_events("primary", _items("a", "c"), service=cal, http=fake)
+    assert [r["status"] for r in again] == ["updated", "created"]
+    assert len(fake.events) == 3
+
+
+def test_dry_run_makes_no_calls():
+    res = reminder.create_followup_events("primary", _items("a"), dry_run=True, service=object())
+    assert res[0]["status"] == "dry_run"
@@ -1,2 +1,39 @@
-def test_placeholder():
-    assert True
+from benchmarks.fakes import FakeWorksheet
+from src.internship_logger.sheets_writer import HEADERS, SheetBatchWriter, upsert_row
+
+
+def _row(email_id, status="Applied"):
+    return {"Company": "Acme", "Role": "SWE Intern", "Status": status, "EmailId": email_id}
+
+
+def test_batch_writer_updates_and_appends_in_two_calls():
+    ws = FakeWorksheet([[""] * 4 + ["Applied", "Email", "e1"]])
+    with SheetBatchWriter(ws) as writer:
+        writer.add(_row("e1", "Interview"))
+        writer.add(_row("e2"))
+        writer.add(_row("e3"))
+        writer.add(_row("e2", "OA"))
+    assert ws.log == ["col_values", "batch_update", "append_rows"]
+    assert [(r[6], r[4]) for r in ws.rows[1:]] == [("e1", "Interview"), ("e2", "OA"), ("e3", "Applied")]
+
+
+def test_batch_writer_flushes_every_n_and_tracks_new_rows():
+    ws = FakeWorksheet()
+    writer = SheetBatchWriter(ws, flush_every=2)
+    writer.add(_row("a"))
+    writer.add(_row("b"))
+    assert ws.log[-1] == "append_rows" and writer.row_of("b") == 3
+    writer.add(_row("a", "Rejected"))
+    writer.flush()
+    assert len(ws.rows) == 3 and ws.rows[1][4] == "Rejected"
+
+
+def test_batch_writer_matches_upsert_row():
+    one, many = FakeWorksheet([["", "", "", "", "Applied", "", "x"]]), FakeWorksheet([["", "", "", "", "Applied", "", "x"]])
+    rows = [_row("x", "OA"), _row("y"), _row("z")]
+    for r in rows:
+        upsert_row(one, r)
+    with SheetBatchWriter(many) as writer:
+        for r in rows:
+            writer.add(r)
+    assert [r[:len(HEADERS)] for r in one.rows] == [r[:len(HEADERS)] for r in many.rows]
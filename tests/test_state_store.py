@@ -0,0 +1,53 @@
+import json
+
+from src.internship_logger.state_store import JsonStateStore, SqliteStateStore
+
+
+def test_sqlite_store_migrates_legacy_json(tmp_path):
+    legacy = tmp_path / "state.json"
+    legacy.write_text(json.dumps({"processed_ids": ["a", "b"], "last_message_id": "b", "history_id": "42"}))
+    store = SqliteStateStore(str(tmp_path / "state.sqlite"), legacy_json=str(legacy))
+    assert store.unprocessed(["a", "c", "b", "d"]) == ["c", "d"]
+    assert store.get("history_id") == "42"
+    assert not legacy.exists() and (tmp_path / "state.json.migrated").exists()
+
+
+def test_sqlite_store_migration_survives_a_crash_before_commit(tmp_path):
+    import sqlite3
+    legacy = tmp_path / "state.json"
+    legacy.write_text(json.dumps({"processed_ids": ["a"], "history_id": "7"}))
+    path = str(tmp_path / "state.sqlite")
+    # the database file exists, but the run died before the import was committed
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE kv (key TEXT PRIMARY KEY, value TEXT)")
+    db.commit()
+    db.close()
+    store = SqliteStateStore(path, legacy_json=str(legacy))
+    assert store.is_processed("a") and store.get("history_id") == "7"
+    store.close()
+    # once done it never runs again, even if a state.json shows up later
+    legacy.write_text(json.dumps({"processed_ids": ["b"]}))
+    assert not SqliteStateStore(path, legacy_json=str(legacy)).is_processed("b")
+
+
+def test_sqlite_store_keeps_committed_work_only(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    store = SqliteStateStore(path, legacy_json=None)
+    store.mark_processed("m1", {"status": "Applied", "company": "Acme"}, engine="rules", engine_version="rules")
+    store.commit()
+    store.mark_processed("m2")  # never committed, as if the run crashed here
+    store._db.close()
+
+    reopened = SqliteStateStore(path, legacy_json=None)
+    assert reopened.is_processed("m1") and not reopened.is_processed("m2")
+    assert reopened.result_of("m1") == {"status": "Applied", "company": "Acme"}
+
+
+def test_json_store_roundtrip(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = JsonStateStore(path)
+    store.mark_processed("x")
+    store.set("history_id", "7")
+    store.close()
+    again = JsonStateStore(path)
+    assert again.is_processed("x") and again.get("history_id") == "7"
@@ -0,0 +1,55 @@
+import dataclasses
+
+from benchmarks.corpus import make_corpus
+from benchmarks.run import bench_process_once
+from src.internship_logger.settings import load_settings
+from src.internship_logger.state_store import JsonStateStore, SqliteStateStore
+from src.internship_logger.triage import score_metadata, triage
+
+
+def _meta(subject, snippet="", labels=("INBOX",), **headers):
+    hs = [{"name": "Subject", "value": subject}, {"name": "From", "value": "Acme <no-reply@greenhouse.io>"}]
+    hs += [{"name": k.replace("_", "-"), "value": v} for k, v in headers.items()]
+    return {"id": subject[:8], "snippet": snippet, "labelIds": list(labels), "sizeEstimate": 5000, "payload": {"headers": hs}}
+
+
+def test_score_metadata_keeps_application_mail_and_skips_alerts():
+    assert score_metadata(_meta("Thank you for applying to Acme")).score == 2
+    # no signal either way: kept, the full parse decides
+    assert score_metadata(_meta("Next steps with Acme", "Hi Alex, a quick note")).keep
+    alert = score_metadata(_meta("New jobs for you at Acme", "Roles picked for you", ("INBOX", "CATEGORY_PROMOTIONS"),
+                                 List_Id="<jobs.acme.example.com>"))
+    assert not alert.keep and alert.reason == "score=-4 job_alert,category_promotions,bulk"
+    # a real status email sent through a mailing-list style sender still gets through
+    assert score_metadata(_meta("Interview invitation: Acme", Precedence="bulk")).keep
+    # status phrases win over talent-community wording and bulk headers, whatever the threshold
+    rejection = _meta("Your application to Acme", "Unfortunately we will not be moving forward. We encourage you to "
+                      "join our talent community", ("INBOX", "CATEGORY_PROMOTIONS"), List_Id="<ats.acme.example.com>")
+    assert score_metadata(rejection, min_score=1).keep
+    assert "job_alert" not in score_metadata(rejection).reason
+    keep, skipped = triage([_meta("Online assessment - Acme"), _meta("Acme is hiring!", labels=("CATEGORY_SOCIAL",))])
+    assert keep == ["Online a"] and [i for i, _ in skipped] == ["Acme is "]
+
+
+def test_skipped_ids_count_as_processed_until_cleared(tmp_path):
+    for store in (SqliteStateStore(str(tmp_path / "s.sqlite"), legacy_json=None), JsonStateStore(str(tmp_path / "s.json"))):
+        store.mark_processed("m1")
+        store.mark_skipped("m2", "score=-3 job_alert", "1")
+        store.commit()
+        assert store.unprocessed(["m1", "m2", "m3"]) == ["m3"]
+        assert store.clear_skipped() == 1
+        assert store.unprocessed(["m1", "m2", "m3"]) == ["m2", "m3"]
+        store.close()
+
+
+def test_process_once_fetches_full_payloads_only_for_kept_mail():
+    cfg = load_settings()
+    corpus = make_corpus(60, seed=2, noise=0.5)
+    noise = sum(m["expected"]["status"] == "Other" for m in corpus)
+    on = bench_process_once(cfg, corpus, "rules", 0.0, serial=True)
+    off = bench_process_once(dataclasses.replace(cfg, gmail=dict(cfg.gmail, triage={"enabled": False})),
+                             corpus, "rules", 0.0, serial=True)
+    gmail = on["api_calls"]["gmail"]
+    assert gmail["messages.get:metadata"] == 60 and gmail["messages.get"] == 60 - noise
+    assert gmail["batch_bytes"] < off["api_calls"]["gmail"]["batch_bytes"]
+    assert on["rows_written"] < off["rows_written"]
@@ -0,0 +1,40 @@
+import threading
+
+from src.internship_logger import watch as watch_mod
+from src.internship_logger.watch import PollInterval, watch
+
+
+def test_poll_interval_backs_off_when_idle_and_resets_on_mail():
+    iv = PollInterval(min_s=30, max_s=200, backoff=2)
+    assert [iv.update(n) for n in (0, 0, 0, 0, 5, 0)] == [60, 120, 200, 200, 30, 60]
+
+
+def test_watch_stops_after_cycle_and_unloads_over_memory_ceiling(monkeypatch):
+    stop = threading.Event()
+    results = iter([3, 0])
+    calls = []
+
+    def run_once():
+        calls.append(1)
+        if len(calls) == 2:
+            stop.set()
+        return next(results)
+
+    unloaded = []
+    monkeypatch.setattr(watch_mod, "rss_mb", lambda: 5000.0)
+    monkeypatch.setattr(watch_mod, "loaded_engines", lambda: ["transformer"])
+    monkeypatch.setattr(watch_mod, "unload_engines", lambda: unloaded.append(1))
+    cycles = watch(run_once, {"min_interval": 1, "memory_limit_mb": 4000}, stop=stop)
+    assert cycles == 2
+    assert len(unloaded) == 2
+
+
+def test_watch_survives_a_failed_cycle(monkeypatch):
+    stop = threading.Event()
+    monkeypatch.setattr(watch_mod, "loaded_engines", lambda: [])
+
+    def run_once():
+        stop.set()
+        raise RuntimeError("quota")
+
+    assert watch(run_once, {}, stop=stop) == 1
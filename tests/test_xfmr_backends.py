@@ -0,0 +1,57 @@
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+import src.internship_logger as pkg
+from src.internship_logger import xfmr_backends
+
+
+def test_backend_options_defaults_and_overrides():
+    assert xfmr_backends.backend_options({}) == {"backend": "torch", "intra_op_threads": None, "max_length": None,
+                                                 "local_files_only": False, "onnx_dir": "data/onnx"}
+    opts = xfmr_backends.backend_options({"backend": "onnx", "intra_op_threads": 2, "max_length": 256,
+                                          "local_files_only": 1, "onnx_dir": "/tmp/onnx", "zero_shot_model": "x"})
+    assert opts == {"backend": "onnx", "intra_op_threads": 2, "max_length": 256, "local_files_only": True,
+                    "onnx_dir": "/tmp/onnx"}
+
+
+def test_build_pipelines_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="tensorrt"):
+        xfmr_backends.build_pipelines("zs", "ner", xfmr_backends.backend_options({"backend": "tensorrt"}))
+
+
+@pytest.fixture
+def fake_xfmr(monkeypatch):
+    """Stands in for nlp_xfmr (torch-free): the quantized backend gets one role wrong."""
+    calls = {"ensure": [], "unload": 0}
+
+    def parse(block, items):
+        out = [{"status": "Applied", "company": subj.split()[-1], "role": "Data Intern"} for subj, _, _, _ in items]
+        if block["backend"] != "torch":
+            out[0] = dict(out[0], role="Intern")
+        return out
+
+    fake = types.SimpleNamespace(
+        _model_names=lambda block: ("zs", "ner", "emb"),
+        _ensure_models=lambda *names_opts: calls["ensure"].append(names_opts),
+        unload_models=lambda: calls.__setitem__("unload", calls["unload"] + 1),
+        parse_emails_transformer=parse,
+    )
+    monkeypatch.setitem(sys.modules, "src.internship_logger.nlp_xfmr", fake)
+    monkeypatch.setattr(pkg, "nlp_xfmr", fake, raising=False)
+    return calls
+
+
+def test_compare_backends_reports_agreement_accuracy_and_timing(fake_xfmr):
+    fixtures = [{"subject": f"Thanks from {c}", "from": "x@y.com", "body": "", "date": datetime(2025, 3, 1),
+                 "expected": {"status": "Applied", "company": c, "role": "Data Intern"}} for c in ("Acme", "Globex")]
+    report = xfmr_backends.compare_backends({"max_length": 128}, fixtures, "quantized")
+    assert [opts["backend"] for *_, opts in fake_xfmr["ensure"]] == ["torch", "quantized"]
+    assert all(opts["max_length"] == 128 for *_, opts in fake_xfmr["ensure"])
+    assert fake_xfmr["unload"] == 3   # before each backend and once at the end
+    assert report["n"] == 2 and report["backend"] == "quantized"
+    assert report["status_agreement"] == report["company_agreement"] == 1.0 and report["role_agreement"] == 0.5
+    assert report["torch_role_accuracy"] == 1.0 and report["quantized_role_accuracy"] == 0.5
+    assert {"torch_load_s", "torch_infer_s", "quantized_load_s", "quantized_infer_s", "speedup"} <= set(report)